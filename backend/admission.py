@@ -0,0 +1,174 @@
+"""Admission control for the chat endpoints: per-client rate limits and a bounded wait queue"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "64"))
+CHAT_QUEUE_SIZE = int(os.getenv("CHAT_QUEUE_SIZE", "128"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "2"))
+# Off by default: behind a proxy (the frontend dev server included) every client shares one IP
+CHAT_RATE_PER_MINUTE = float(os.getenv("CHAT_RATE_PER_MINUTE", "0"))
+CHAT_RATE_BURST = int(os.getenv("CHAT_RATE_BURST", "10"))
+# Clients whose buckets are kept; the least recently seen are forgotten first
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+
+# Weight of the newest request in the average service time
+SERVICE_TIME_SMOOTHING = 0.2
+
+ADMISSION_WAIT = metrics.registry.register(metrics.Histogram(
+    "chat_admission_wait_seconds", "Time chat requests waited in the admission queue"))
+
+class AdmissionRejected(Exception):
+    """A request turned away; maps to an HTTP error with a Retry-After header"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+class RateLimiter:
+    """Token bucket per client key, with a bounded number of tracked clients"""
+
+    def __init__(self, per_minute: float = CHAT_RATE_PER_MINUTE, burst: int = CHAT_RATE_BURST,
+                 max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.rate = per_minute / 60
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str) -> float:
+        """Take a token for key; returns 0 when allowed, else seconds until the next token"""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.burst, now)
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+class AdmissionController:
+    """Bounded in-flight chat requests with a short FIFO wait queue"""
+
+    def __init__(self, max_in_flight: int = CHAT_MAX_IN_FLIGHT, queue_size: int = CHAT_QUEUE_SIZE,
+                 queue_timeout: float = CHAT_QUEUE_TIMEOUT, rate_limiter: Optional[RateLimiter] = None):
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.in_flight = 0
+        self.queue: deque = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+        # Smoothed seconds a request holds its slot, for Retry-After estimates
+        self.service_time = 1.0
+
+    def _retry_after(self) -> float:
+        """Rough time until a slot frees up for a request joining the queue now"""
+        return self.service_time * (len(self.queue) + 1) / max(self.max_in_flight, 1)
+
+    def _reject(self, status_code: int, reason: str, retry_after: float):
+        self.rejected[reason] += 1
+        # Rate limiting is per client and routine; shedding means the worker is saturated
+        log = logger.debug if status_code == 429 else logger.warning
+        log("Chat request rejected (%s): %d in flight, %d queued, retry after %.1fs",
+            reason, self.in_flight, len(self.queue), retry_after)
+        raise AdmissionRejected(status_code, reason, retry_after)
+
+    async def acquire(self, client_key: str) -> float:
+        """Wait for an in-flight slot; returns the admission time to pass to release()"""
+        wait = self.rate_limiter.acquire(client_key)
+        if wait:
+            self._reject(429, "rate_limited", wait)
+
+        if self.in_flight < self.max_in_flight and not self.queue:
+            self.in_flight += 1
+        elif len(self.queue) >= self.queue_size:
+            self._reject(503, "queue_full", self._retry_after())
+        else:
+            self.queued += 1
+            waiter = asyncio.get_running_loop().create_future()
+            self.queue.append(waiter)
+            start = time.perf_counter()
+            try:
+                # release() hands its slot over by resolving the waiter
+                await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot arrived as the wait ended; pass it on
+                    self._release_slot()
+                else:
+                    waiter.cancel()
+                    self.queue.remove(waiter)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self._reject(503, "queue_timeout", self._retry_after())
+            finally:
+                ADMISSION_WAIT.observe(time.perf_counter() - start)
+        self.admitted += 1
+        return time.perf_counter()
+
+    def _release_slot(self):
+        while self.queue:
+            waiter = self.queue.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def release(self, admitted_at: float):
+        """Free a slot, handing it to the longest-waiting request if any"""
+        held = time.perf_counter() - admitted_at
+        self.service_time += SERVICE_TIME_SMOOTHING * (held - self.service_time)
+        self._release_slot()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self.queue),
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "avg_service_seconds": round(self.service_time, 3),
+            "rate_limit": {
+                "per_minute": self.rate_limiter.rate * 60,
+                "burst": self.rate_limiter.burst,
+                "tracked_clients": len(self.rate_limiter.buckets),
+            },
+        }
+
+chat_admission = AdmissionController()
@@ -0,0 +1,159 @@
+"""Benchmark the local intent classifier against the LLM round-trip it replaces
+
+Usage (from the backend directory):
+
+    python benchmarks/bench_intent.py                 # assumes --llm-ms per LLM call
+    python benchmarks/bench_intent.py --llm           # measures real Groq round-trips
+    python benchmarks/bench_intent.py --threshold 0.6 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_classifier import IntentClassifier
+
+# Labeled sample of customer messages
+LABELED_SAMPLE = [
+    ("Show me the status of order ID 12345", "order_status"),
+    ("Where is my order #98231?", "order_status"),
+    ("Has order 55512 shipped yet?", "order_status"),
+    ("I want to track my package", "order_status"),
+    ("When will my order be delivered?", "order_status"),
+    ("tracking info for 784512 please", "order_status"),
+    ("What's the status of my purchase 66123", "order_status"),
+    ("My order hasn't arrived", "order_status"),
+    ("How many Classic T-Shirts are left in stock?", "stock_check"),
+    ("Is the black hoodie available?", "stock_check"),
+    ("Do you have jeans in stock", "stock_check"),
+    ("Are sneakers out of stock?", "stock_check"),
+    ("What quantity of sweaters do you have?", "stock_check"),
+    ("How many dresses are remaining", "stock_check"),
+    ("Check inventory for boots", "stock_check"),
+    ("Is the jacket still available in medium?", "stock_check"),
+    ("What are the top 5 most sold products?", "product_query"),
+    ("Show me your best selling items", "product_query"),
+    ("What products do you have for women?", "product_query"),
+    ("Tell me about your jackets", "product_query"),
+    ("What's the price of the denim skirt?", "product_query"),
+    ("Which brands of shoes do you carry", "product_query"),
+    ("Recommend a shirt for summer", "product_query"),
+    ("What categories of clothing do you sell?", "product_query"),
+    ("Show me the most popular hats", "product_query"),
+    ("top 10 products", "product_query"),
+    ("Hello", "general_help"),
+    ("Hi there, can you help me?", "general_help"),
+    ("How do I return an item?", "general_help"),
+    ("What is your refund policy", "general_help"),
+    ("I want to talk to an agent", "general_help"),
+    ("Thanks for your help!", "general_help"),
+    ("How can I contact support?", "general_help"),
+    ("Can I cancel my subscription", "general_help"),
+    ("What are your opening hours?", "general_help"),
+    ("Do you ship internationally?", "general_help"),
+]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def measure_llm_ms(messages):
+    """Time real Groq intent round-trips for the given messages"""
+    from llm_service import LLMService
+
+    service = LLMService()
+    timings = []
+    for message in messages:
+        start = time.perf_counter()
+        try:
+            await service.llm.acreate(
+                messages=service._intent_messages(message),
+                model=service.model,
+                temperature=0.1,
+                max_tokens=200
+            )
+        except Exception as e:
+            print(f"Error calling Groq API: {e}", file=sys.stderr)
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(timings) if timings else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent classifier benchmark")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.5")))
+    parser.add_argument("--iterations", type=int, default=200, help="classification passes over the sample")
+    parser.add_argument("--llm", action="store_true", help="measure real Groq round-trips (needs GROQ_API_KEY)")
+    parser.add_argument("--llm-ms", type=float, default=350.0, help="assumed LLM round-trip when --llm is not set")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    classifier = IntentClassifier()
+
+    # Warm up, then time every classification individually
+    for message, _ in LABELED_SAMPLE:
+        classifier.classify(message)
+    timings_us = []
+    for _ in range(args.iterations):
+        for message, _ in LABELED_SAMPLE:
+            start = time.perf_counter()
+            classifier.classify(message)
+            timings_us.append((time.perf_counter() - start) * 1e6)
+
+    results = [(message, label, classifier.classify(message)) for message, label in LABELED_SAMPLE]
+    fallbacks = [r for _, _, r in results if r["confidence"] < args.threshold]
+    confident = [(label, r) for _, label, r in results if r["confidence"] >= args.threshold]
+    correct = sum(1 for _, label, r in results if r["intent"] == label)
+    confident_correct = sum(1 for label, r in confident if r["intent"] == label)
+
+    llm_ms = asyncio.run(measure_llm_ms([m for m, _ in LABELED_SAMPLE])) if args.llm else args.llm_ms
+    local_ms = statistics.mean(timings_us) / 1000
+    fallback_rate = len(fallbacks) / len(results)
+    # Old path: one intent round-trip per message. New path: local pass plus a round-trip on fallback only.
+    saved_ms = llm_ms - (local_ms + fallback_rate * llm_ms) if llm_ms is not None else None
+
+    report = {
+        "messages": len(results),
+        "threshold": args.threshold,
+        "local_latency_us": {
+            "mean": round(statistics.mean(timings_us), 2),
+            "p50": round(percentile(timings_us, 50), 2),
+            "p95": round(percentile(timings_us, 95), 2),
+            "p99": round(percentile(timings_us, 99), 2),
+        },
+        "accuracy_local": round(correct / len(results), 3),
+        "accuracy_above_threshold": round(confident_correct / len(confident), 3) if confident else None,
+        "fallback_rate": round(fallback_rate, 3),
+        "llm_round_trip_ms": round(llm_ms, 1) if llm_ms is not None else None,
+        "llm_round_trip_measured": args.llm,
+        "latency_saved_per_message_ms": round(saved_ms, 1) if saved_ms is not None else None,
+        "misclassified": [
+            {"message": m, "expected": label, "got": r["intent"], "confidence": r["confidence"]}
+            for m, label, r in results if r["intent"] != label
+        ],
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Messages:                 {report['messages']}")
+    print(f"Local latency (us):       mean {report['local_latency_us']['mean']}, "
+          f"p50 {report['local_latency_us']['p50']}, p95 {report['local_latency_us']['p95']}")
+    print(f"Local accuracy:           {report['accuracy_local']:.1%}")
+    if report["accuracy_above_threshold"] is not None:
+        print(f"Accuracy >= threshold:    {report['accuracy_above_threshold']:.1%}")
+    print(f"Fallback rate @ {args.threshold}:     {report['fallback_rate']:.1%}")
+    source = "measured" if args.llm else "assumed"
+    print(f"LLM round-trip ({source}): {report['llm_round_trip_ms']} ms")
+    print(f"Latency saved / message:  {report['latency_saved_per_message_ms']} ms")
+    for miss in report["misclassified"]:
+        print(f"  miss: {miss['message']!r} expected {miss['expected']} got {miss['got']} ({miss['confidence']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark the product search index against the ILIKE scan it replaces
+
+Usage (from the backend directory):
+
+    python benchmarks/bench_search.py                          # 30k and 1M products
+    python benchmarks/bench_search.py --sizes 30000 --json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_dataset import ADJECTIVES, BRANDS, COLOURS, GARMENTS
+from product_search import ProductSearchIndex
+
+# Chat-style queries, including a prefix and typos
+QUERIES = [
+    "black hoodie", "Do you have any slim fit jeans?", "levis jeans", "patagonia jacket",
+    "show me navy polo shirts", "women's maxi dress", "thermal", "cargo shorts khaki",
+    "carhart", "sweter", "puff", "red beanie", "organic cotton tee", "vintage denim blue jeans",
+    "tommy hilfiger sweater", "outerwear", "baseball cap", "heavyweight crew neck tee",
+]
+
+def generate_catalog(size: int, seed: int = 41):
+    """(id, name, brand, category, department) rows"""
+    rng = random.Random(seed)
+    categories = list(GARMENTS)
+    rows = []
+    for product_id in range(1, size + 1):
+        category = rng.choice(categories)
+        brand = rng.choice(BRANDS)
+        name = f"{brand} {rng.choice(ADJECTIVES)} {rng.choice(COLOURS)} {rng.choice(GARMENTS[category])} {product_id % 997}"
+        rows.append((product_id, name, brand, category, rng.choice(["Men", "Women"])))
+    return rows
+
+def ilike_scan(rows, query: str, limit: int = 10):
+    """The old search: whole query as a substring of name, category or brand"""
+    needle = query.lower()
+    results = []
+    for row in rows:
+        if needle in row[1].lower() or needle in row[3].lower() or needle in row[2].lower():
+            results.append(row[0])
+            if len(results) >= limit:
+                break
+    return results
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_summary(timings_ms):
+    return {
+        "mean": round(statistics.mean(timings_ms), 3),
+        "p50": round(percentile(timings_ms, 50), 3),
+        "p95": round(percentile(timings_ms, 95), 3),
+        "p99": round(percentile(timings_ms, 99), 3),
+    }
+
+def bench_size(size: int, iterations: int, baseline_iterations: int):
+    rows = generate_catalog(size)
+    index = ProductSearchIndex(rows)
+
+    for query in QUERIES:
+        index.search(query)
+    timings = []
+    hits = 0
+    for _ in range(iterations):
+        for query in QUERIES:
+            start = time.perf_counter()
+            results = index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+            hits += bool(results)
+
+    baseline_timings = []
+    baseline_hits = 0
+    for _ in range(baseline_iterations):
+        for query in QUERIES:
+            start = time.perf_counter()
+            results = ilike_scan(rows, query)
+            baseline_timings.append((time.perf_counter() - start) * 1000)
+            baseline_hits += bool(results)
+
+    return {
+        "products": size,
+        "terms": len(index.postings),
+        "build_seconds": round(index.build_seconds, 2),
+        "index_mb": round(index.memory_bytes() / 1024 / 1024, 1),
+        "index_latency_ms": latency_summary(timings),
+        "index_queries_with_results": round(hits / len(timings), 3),
+        "scan_latency_ms": latency_summary(baseline_timings) if baseline_timings else None,
+        "scan_queries_with_results": round(baseline_hits / len(baseline_timings), 3) if baseline_timings else None,
+        "sample": {query: index.search(query, 3) for query in QUERIES[:4]},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Product search benchmark")
+    parser.add_argument("--sizes", default="30000,1000000", help="comma-separated catalog sizes")
+    parser.add_argument("--iterations", type=int, default=20, help="passes over the query sample")
+    parser.add_argument("--baseline-iterations", type=int, default=2, help="passes for the substring scan")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    reports = [
+        bench_size(int(size), args.iterations, args.baseline_iterations)
+        for size in args.sizes.split(",")
+    ]
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    for report in reports:
+        print(f"Catalog:              {report['products']} products, {report['terms']} terms")
+        print(f"Index build:          {report['build_seconds']} s, {report['index_mb']} MB of postings")
+        latency = report["index_latency_ms"]
+        print(f"Index query (ms):     p50 {latency['p50']}, p95 {latency['p95']}, p99 {latency['p99']} "
+              f"({report['index_queries_with_results']:.0%} with results)")
+        if report["scan_latency_ms"]:
+            latency = report["scan_latency_ms"]
+            print(f"ILIKE-style scan (ms): p50 {latency['p50']}, p95 {latency['p95']}, p99 {latency['p99']} "
+                  f"({report['scan_queries_with_results']:.0%} with results)")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Guard against CSV timestamps being rejected by the vectorised schema
+
+Usage (from the backend directory):
+
+    python benchmarks/check_csv_schema.py
+"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from table_schemas import apply_schema
+
+# (raw created_at, expected naive UTC value)
+VALID = [
+    ("2022-01-02 11:00:00+00:00", datetime(2022, 1, 2, 11, 0, 0)),
+    ("2022-01-02 11:00:00.123456+00:00", datetime(2022, 1, 2, 11, 0, 0, 123456)),
+    ("2022-01-02 11:00:00.5+00:00", datetime(2022, 1, 2, 11, 0, 0, 500000)),
+    ("2022-01-02 13:00:00+02:00", datetime(2022, 1, 2, 11, 0, 0)),
+    ("2022-01-02T11:00:00Z", datetime(2022, 1, 2, 11, 0, 0)),
+    ("2022-01-02 11:00:00 UTC", datetime(2022, 1, 2, 11, 0, 0)),
+    ("2022-01-02", datetime(2022, 1, 2)),
+]
+INVALID = ["not a date", "2022-13-45 25:00:00"]
+
+def main():
+    raw = [value for value, _ in VALID] + INVALID
+    chunk = pd.DataFrame({"id": range(1, len(raw) + 1), "created_at": raw})
+    frame, rejects = apply_schema("users", chunk)
+
+    failures = []
+    for (value, expected), row_id in zip(VALID, range(1, len(VALID) + 1)):
+        parsed = frame.loc[frame["id"] == row_id, "created_at"]
+        if parsed.empty:
+            failures.append(f"{value!r} was rejected")
+        elif parsed.iloc[0].to_pydatetime() != expected:
+            failures.append(f"{value!r} parsed as {parsed.iloc[0]}, expected {expected}")
+    if len(rejects) != len(INVALID):
+        failures.append(f"expected {len(INVALID)} rejected rows, got {len(rejects)}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"OK: {len(VALID)} timestamp layouts parsed, {len(INVALID)} invalid values rejected")
+
+if __name__ == "__main__":
+    main()
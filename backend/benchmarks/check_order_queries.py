@@ -0,0 +1,73 @@
+"""Guard against N+1 regressions in the order-detail lookup
+
+Usage (from the backend directory):
+
+    python benchmarks/check_order_queries.py
+"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base, Product, User, Order, OrderItem
+from business_logic import BusinessLogicService
+
+MAX_QUERIES = 1
+ITEMS = 5
+
+def seed(session):
+    session.add(User(id=1, first_name="Ada", last_name="Lovelace", email="ada@example.com"))
+    session.add(Order(order_id=1001, user_id=1, status="Shipped", created_at=datetime(2024, 1, 1), num_of_item=ITEMS))
+    for i in range(1, ITEMS + 1):
+        session.add(Product(id=i, name=f"Product {i}", brand="Acme", category="Tops", retail_price=10.0 * i))
+        session.add(OrderItem(id=i, order_id=1001, user_id=1, product_id=i, status="Shipped", sale_price=9.0 * i))
+    session.commit()
+
+def trace_order_lookup():
+    """Seed an in-memory database and return the order detail with the SQL statements it issued"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    seed(session)
+    session.expunge_all()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    try:
+        order = BusinessLogicService(session).get_order_status("1001")
+    finally:
+        session.close()
+        engine.dispose()
+    return order, statements
+
+def main():
+    order, statements = trace_order_lookup()
+
+    failures = []
+    if len(statements) > MAX_QUERIES:
+        failures.append(f"expected at most {MAX_QUERIES} queries, got {len(statements)}")
+    if "error" in order:
+        failures.append(f"lookup failed: {order['error']}")
+    else:
+        if order["user_name"] != "Ada Lovelace":
+            failures.append(f"unexpected customer {order['user_name']!r}")
+        names = [item["product_name"] for item in order["items"]]
+        if names != [f"Product {i}" for i in range(1, ITEMS + 1)]:
+            failures.append(f"unexpected product names {names}")
+
+    for statement in statements:
+        print(" ".join(statement.split())[:160] + ("..." if len(statement) > 160 else ""))
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"OK: order detail loaded in {len(statements)} query")
+
+if __name__ == "__main__":
+    main()
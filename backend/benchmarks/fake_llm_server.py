@@ -0,0 +1,185 @@
+"""Local stand-in for the Groq chat completions API, for load tests
+
+Usage (from the backend directory):
+
+    python benchmarks/fake_llm_server.py --port 8089 --latency-ms 300 --jitter-ms 100
+    GROQ_BASE_URL=http://127.0.0.1:8089 GROQ_API_KEY=fake uvicorn main:app   # point the backend at it
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+ANSWER_WORDS = (
+    "Thanks for reaching out! Based on the information available, here is what I found for you. "
+    "Let me know if there is anything else I can help you with today."
+).split()
+
+INTENT_ANSWER = json.dumps({"intent": "general_help", "entities": {}, "requires_clarification": False})
+
+class FakeLLMConfig:
+    def __init__(self, latency_ms: float = 300.0, jitter_ms: float = 50.0, token_delay_ms: float = 10.0,
+                 tokens: int = 40, error_rate: float = 0.0, seed: int = 7):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_delay_ms = token_delay_ms
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.streams = 0
+        self.errors = 0
+
+    def delay(self) -> float:
+        """Seconds before the answer (or first token)"""
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "streams": self.streams, "errors": self.errors}
+
+def _prompt_tokens(messages) -> int:
+    return sum(math.ceil(len(message.get("content") or "") / 4) + 4 for message in messages)
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: FakeLLMConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path.split("?")[0] != COMPLETIONS_PATH:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        config = self.config
+        with config.lock:
+            config.requests += 1
+
+        time.sleep(config.delay())
+        if config.should_fail():
+            with config.lock:
+                config.errors += 1
+            self._send_json(500, {"error": {"message": "Simulated upstream failure", "type": "internal_error"}})
+            return
+
+        messages = body.get("messages") or []
+        intent = any("intent classification" in (message.get("content") or "") for message in messages)
+        words = [INTENT_ANSWER] if intent else [
+            ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(min(config.tokens, body.get("max_tokens") or config.tokens))
+        ]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "fake-model")
+        usage = _usage(_prompt_tokens(messages), len(words))
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        with config.lock:
+            config.streams += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(config.token_delay_ms / 1000)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"id": completion_id, "usage": usage},
+        }
+        self._write_chunk(f"data: {json.dumps(final)}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def start_server(config: FakeLLMConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve in a background thread; port 0 picks a free port (see server.server_address)"""
+    handler = type("ConfiguredFakeLLMHandler", (FakeLLMHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="time to the answer or first token")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="uniform +/- jitter on the latency")
+    parser.add_argument("--token-delay-ms", type=float, default=10.0, help="gap between streamed tokens")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(args.latency_ms, args.jitter_ms, args.token_delay_ms, args.tokens, args.error_rate, args.seed)
+    server = start_server(config, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Fake LLM listening on http://{host}:{port} (set GROQ_BASE_URL to this)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(config.stats()))
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
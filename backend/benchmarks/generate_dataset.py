@@ -0,0 +1,338 @@
+"""Generate a synthetic, referentially consistent e-commerce dataset at a scale factor
+
+Usage (from the backend directory):
+
+    python benchmarks/generate_dataset.py --scale 1                      # data/sf1
+    python benchmarks/generate_dataset.py --scale 10 --out /data/sf10
+    python benchmarks/generate_dataset.py --scale 0.1 --load --mode bulk # also load DATABASE_URL
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Catalog vocabulary, shared with bench_search.py
+BRANDS = ["Calvin Klein", "Levi's", "Carhartt", "Columbia", "Hanes", "Nike", "Adidas", "Tommy Hilfiger",
+          "Ralph Lauren", "Champion", "Dockers", "Wrangler", "Patagonia", "Quiksilver", "Volcom", "Gildan"]
+ADJECTIVES = ["Classic", "Slim Fit", "Relaxed", "Vintage", "Essential", "Premium", "Lightweight", "Heavyweight",
+              "Stretch", "Organic", "Performance", "Athletic", "Cropped", "Oversized", "Quilted", "Thermal"]
+COLOURS = ["Black", "White", "Navy", "Heather Grey", "Olive", "Burgundy", "Khaki", "Denim Blue", "Charcoal", "Red"]
+GARMENTS = {
+    "Tops & Tees": ["T-Shirt", "Tank Top", "Henley", "Polo Shirt", "Crew Neck Tee"],
+    "Jeans": ["Jeans", "Skinny Jeans", "Bootcut Jeans", "Straight Leg Jeans"],
+    "Outerwear & Coats": ["Jacket", "Parka", "Puffer Jacket", "Windbreaker", "Rain Coat"],
+    "Sweaters": ["Sweater", "Cardigan", "Turtleneck", "Pullover"],
+    "Fashion Hoodies & Sweatshirts": ["Hoodie", "Zip Hoodie", "Sweatshirt"],
+    "Dresses": ["Dress", "Maxi Dress", "Wrap Dress", "Shirt Dress"],
+    "Shorts": ["Shorts", "Cargo Shorts", "Board Shorts"],
+    "Accessories": ["Beanie", "Baseball Cap", "Scarf", "Belt", "Gloves"],
+}
+
+# Rows per table at SF1
+SF1_ROWS = {
+    "products": 29120,
+    "users": 100000,
+    "orders": 125000,
+}
+# Unsold share of all inventory items at SF1
+UNSOLD_RATIO = 0.63
+ZIPF_EXPONENT = 1.1
+CHUNK_ORDERS = 250000
+
+STATUS_MIX = {"Complete": 0.25, "Shipped": 0.30, "Processing": 0.20, "Cancelled": 0.15, "Returned": 0.10}
+ITEMS_PER_ORDER = {1: 0.65, 2: 0.25, 3: 0.07, 4: 0.03}
+
+START = int(datetime(2019, 1, 1, tzinfo=timezone.utc).timestamp())
+END = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+DAY = 86400
+
+DISTRIBUTION_CENTERS = [
+    (1, "Memphis TN", 35.1174, -89.9711),
+    (2, "Chicago IL", 41.8369, -87.6847),
+    (3, "Houston TX", 29.7604, -95.3698),
+    (4, "Los Angeles CA", 34.0500, -118.2500),
+    (5, "New Orleans LA", 29.9500, -90.0667),
+    (6, "Port Authority of New York/New Jersey NY/NJ", 40.6340, -73.7834),
+    (7, "Philadelphia PA", 39.9500, -75.1667),
+    (8, "Mobile AL", 30.6944, -88.0431),
+    (9, "Charleston SC", 32.7833, -79.9333),
+    (10, "Savannah GA", 32.0167, -81.1167),
+]
+
+# Typical retail price per category; individual prices vary log-normally around it
+CATEGORY_PRICES = {
+    "Tops & Tees": 25.0, "Jeans": 60.0, "Outerwear & Coats": 120.0, "Sweaters": 70.0,
+    "Fashion Hoodies & Sweatshirts": 55.0, "Dresses": 75.0, "Shorts": 35.0, "Accessories": 20.0,
+}
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Wei", "Yuki",
+               "Carlos", "Maria", "Ahmed", "Fatima", "Olga", "Ivan", "Priya", "Arjun", "Lucas", "Camila"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Wang", "Li", "Zhang", "Tanaka", "Sato", "Silva", "Santos", "Kumar", "Singh", "Ivanov", "Muller", "Rossi"]
+# (country, state, city, weight)
+LOCATIONS = [
+    ("United States", "California", "Los Angeles", 0.12), ("United States", "New York", "New York", 0.10),
+    ("United States", "Texas", "Houston", 0.08), ("United States", "Illinois", "Chicago", 0.06),
+    ("China", "Guangdong", "Shenzhen", 0.14), ("China", "Shanghai", "Shanghai", 0.10),
+    ("Brasil", "São Paulo", "São Paulo", 0.10), ("South Korea", "Seoul", "Seoul", 0.05),
+    ("France", "Île-de-France", "Paris", 0.05), ("United Kingdom", "England", "London", 0.05),
+    ("Germany", "Berlin", "Berlin", 0.05), ("Japan", "Tokyo", "Tokyo", 0.04), ("Spain", "Madrid", "Madrid", 0.03),
+    ("Australia", "New South Wales", "Sydney", 0.03),
+]
+
+def table_rows(scale: float) -> Dict[str, int]:
+    return {table: max(int(round(rows * scale)), 1) for table, rows in SF1_ROWS.items()}
+
+def _rng(seed: int, table: str, chunk: int = 0) -> np.random.Generator:
+    """Independent stream per table and chunk, so tables do not shift when another changes"""
+    return np.random.default_rng([seed, zlib.crc32(table.encode()), chunk])
+
+def _datetimes(seconds: np.ndarray, present: np.ndarray = None) -> pd.Series:
+    values = pd.Series(pd.to_datetime(seconds, unit="s"))
+    return values if present is None else values.where(present)
+
+def _write(frame: pd.DataFrame, path: str, first: bool):
+    frame.to_csv(path, mode="w" if first else "a", header=first, index=False, date_format="%Y-%m-%d %H:%M:%S")
+
+def generate_products(out_dir: str, count: int, seed: int) -> pd.DataFrame:
+    rng = _rng(seed, "products")
+    categories = np.array(list(GARMENTS), dtype=object)
+    category = categories[rng.integers(0, len(categories), count)]
+    brand = np.array(BRANDS, dtype=object)[rng.integers(0, len(BRANDS), count)]
+    adjective = np.array(ADJECTIVES, dtype=object)[rng.integers(0, len(ADJECTIVES), count)]
+    colour = np.array(COLOURS, dtype=object)[rng.integers(0, len(COLOURS), count)]
+    picks = rng.random(count)
+    garment = np.array([GARMENTS[c][int(p * len(GARMENTS[c]))] for c, p in zip(category, picks)], dtype=object)
+    base_price = np.array([CATEGORY_PRICES[c] for c in category])
+    retail_price = np.round(base_price * rng.lognormal(0.0, 0.35, count), 2)
+
+    products = pd.DataFrame({
+        "id": np.arange(1, count + 1),
+        "cost": np.round(retail_price * rng.uniform(0.35, 0.6, count), 2),
+        "category": category,
+        "name": brand + " " + adjective + " " + colour + " " + garment,
+        "brand": brand,
+        "retail_price": retail_price,
+        "department": np.where(rng.random(count) < 0.5, "Men", "Women"),
+        "sku": [f"{value:016X}" for value in rng.integers(0, 2 ** 63, count, dtype=np.int64)],
+        "distribution_center_id": rng.integers(1, len(DISTRIBUTION_CENTERS) + 1, count),
+    })
+    _write(products, os.path.join(out_dir, "products.csv"), True)
+    return products
+
+def generate_users(out_dir: str, count: int, seed: int) -> np.ndarray:
+    """Writes users.csv; returns each user's created_at in epoch seconds"""
+    rng = _rng(seed, "users")
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), count)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), count)]
+    weights = np.array([location[3] for location in LOCATIONS])
+    location = rng.choice(len(LOCATIONS), count, p=weights / weights.sum())
+    ids = np.arange(1, count + 1)
+    # Sign-ups leave at least 30 days before the end of the order window
+    created = rng.integers(START, END - 30 * DAY, count)
+
+    users = pd.DataFrame({
+        "id": ids,
+        "first_name": first,
+        "last_name": last,
+        "email": [f"{f.lower()}.{l.lower()}{i}@example.com" for f, l, i in zip(first, last, ids)],
+        "age": rng.integers(12, 71, count),
+        "country": [LOCATIONS[i][0] for i in location],
+        "city": [LOCATIONS[i][2] for i in location],
+        "state": [LOCATIONS[i][1] for i in location],
+        "postal_code": [f"{value:05d}" for value in rng.integers(1000, 99999, count)],
+        "created_at": _datetimes(created),
+    })
+    _write(users, os.path.join(out_dir, "users.csv"), True)
+    return created
+
+def popularity_sampler(product_count: int, exponent: float, seed: int):
+    """Draw product IDs with Zipfian popularity, ranks shuffled over the ID range"""
+    rng = _rng(seed, "popularity")
+    ranking = rng.permutation(product_count) + 1
+    weights = 1.0 / np.arange(1, product_count + 1) ** exponent
+    cdf = np.cumsum(weights)
+    cdf /= cdf[-1]
+
+    def sample(rng: np.random.Generator, size: int) -> np.ndarray:
+        ranks = np.minimum(np.searchsorted(cdf, rng.random(size)), product_count - 1)
+        return ranking[ranks]
+    return sample
+
+def _inventory_frame(ids: np.ndarray, product_ids: np.ndarray, created: np.ndarray, sold_at: pd.Series,
+                     products: pd.DataFrame) -> pd.DataFrame:
+    product = products.iloc[product_ids - 1]
+    return pd.DataFrame({
+        "id": ids,
+        "product_id": product_ids,
+        "created_at": _datetimes(created),
+        "sold_at": sold_at.values,
+        "cost": product["cost"].values,
+        "product_category": product["category"].values,
+        "product_name": product["name"].values,
+        "product_brand": product["brand"].values,
+        "product_retail_price": product["retail_price"].values,
+        "product_department": product["department"].values,
+        "product_sku": product["sku"].values,
+        "product_distribution_center_id": product["distribution_center_id"].values,
+    })
+
+def generate_orders(out_dir: str, order_count: int, user_created: np.ndarray, products: pd.DataFrame,
+                    seed: int, zipf: float, chunk_orders: int = CHUNK_ORDERS) -> Dict[str, int]:
+    """Writes orders, order_items and the sold inventory items; returns row counts"""
+    sample_products = popularity_sampler(len(products), zipf, seed)
+    statuses = np.array(list(STATUS_MIX), dtype=object)
+    status_p = np.array(list(STATUS_MIX.values()))
+    item_counts = np.array(list(ITEMS_PER_ORDER))
+    item_p = np.array(list(ITEMS_PER_ORDER.values()))
+    prices = products["retail_price"].values
+    items_written = 0
+
+    for chunk, start in enumerate(range(0, order_count, chunk_orders)):
+        rng = _rng(seed, "orders", chunk)
+        size = min(chunk_orders, order_count - start)
+        order_ids = np.arange(start + 1, start + size + 1)
+        user_ids = rng.integers(1, len(user_created) + 1, size)
+        signed_up = user_created[user_ids - 1]
+        created = signed_up + (rng.random(size) * (END - signed_up)).astype(np.int64)
+        status = statuses[rng.choice(len(statuses), size, p=status_p)]
+        shipped = created + rng.integers(DAY // 4, 3 * DAY, size)
+        delivered = shipped + rng.integers(DAY, 5 * DAY, size)
+        returned = delivered + rng.integers(DAY, 10 * DAY, size)
+        has_shipped = np.isin(status, ["Shipped", "Complete", "Returned"])
+        has_delivered = np.isin(status, ["Complete", "Returned"])
+        has_returned = status == "Returned"
+        num_items = item_counts[rng.choice(len(item_counts), size, p=item_p)]
+
+        orders = pd.DataFrame({
+            "order_id": order_ids,
+            "user_id": user_ids,
+            "status": status,
+            "gender": np.where(rng.random(size) < 0.5, "M", "F"),
+            "created_at": _datetimes(created),
+            "returned_at": _datetimes(returned, has_returned),
+            "shipped_at": _datetimes(shipped, has_shipped),
+            "delivered_at": _datetimes(delivered, has_delivered),
+            "num_of_item": num_items,
+        })
+        _write(orders, os.path.join(out_dir, "orders.csv"), chunk == 0)
+
+        # One row per item, each consuming one inventory item sold when the order was placed
+        owner = np.repeat(np.arange(size), num_items)
+        item_total = len(owner)
+        product_ids = sample_products(rng, item_total)
+        inventory_ids = np.arange(items_written + 1, items_written + item_total + 1)
+        item_created = created[owner]
+
+        order_items = pd.DataFrame({
+            "order_id": order_ids[owner],
+            "user_id": user_ids[owner],
+            "product_id": product_ids,
+            "inventory_item_id": inventory_ids,
+            "status": status[owner],
+            "created_at": _datetimes(item_created),
+            "shipped_at": _datetimes(shipped[owner], has_shipped[owner]),
+            "delivered_at": _datetimes(delivered[owner], has_delivered[owner]),
+            "returned_at": _datetimes(returned[owner], has_returned[owner]),
+            "sale_price": prices[product_ids - 1],
+        })
+        _write(order_items, os.path.join(out_dir, "order_items.csv"), chunk == 0)
+
+        stocked = item_created - rng.integers(DAY, 90 * DAY, item_total)
+        inventory = _inventory_frame(inventory_ids, product_ids, stocked, _datetimes(item_created), products)
+        _write(inventory, os.path.join(out_dir, "inventory_items.csv"), chunk == 0)
+        items_written += item_total
+
+    return {"orders": order_count, "order_items": items_written}
+
+def generate_unsold_inventory(out_dir: str, first_id: int, count: int, products: pd.DataFrame, seed: int,
+                              chunk_rows: int = 1000000) -> int:
+    for chunk, start in enumerate(range(0, count, chunk_rows)):
+        rng = _rng(seed, "inventory", chunk)
+        size = min(chunk_rows, count - start)
+        ids = np.arange(first_id + start, first_id + start + size)
+        product_ids = rng.integers(1, len(products) + 1, size)
+        stocked = rng.integers(START, END, size)
+        empty = pd.Series(pd.NaT, index=range(size), dtype="datetime64[ns]")
+        _write(_inventory_frame(ids, product_ids, stocked, empty, products),
+               os.path.join(out_dir, "inventory_items.csv"), False)
+    return count
+
+def generate(out_dir: str, scale: float, seed: int = 42, zipf: float = ZIPF_EXPONENT,
+             unsold_ratio: float = UNSOLD_RATIO, chunk_orders: int = CHUNK_ORDERS) -> Dict[str, int]:
+    """Write every CSV and a manifest.json into out_dir; returns row counts per table"""
+    os.makedirs(out_dir, exist_ok=True)
+    counts = table_rows(scale)
+    started = time.perf_counter()
+
+    dc = pd.DataFrame(DISTRIBUTION_CENTERS, columns=["id", "name", "latitude", "longitude"])
+    _write(dc, os.path.join(out_dir, "distribution_centers.csv"), True)
+    products = generate_products(out_dir, counts["products"], seed)
+    user_created = generate_users(out_dir, counts["users"], seed)
+    order_counts = generate_orders(out_dir, counts["orders"], user_created, products, seed, zipf, chunk_orders)
+
+    sold = order_counts["order_items"]
+    unsold = int(round(sold * unsold_ratio / (1 - unsold_ratio))) if unsold_ratio < 1 else 0
+    generate_unsold_inventory(out_dir, sold + 1, unsold, products, seed)
+
+    rows = {
+        "distribution_centers": len(dc),
+        "products": counts["products"],
+        "users": counts["users"],
+        **order_counts,
+        "inventory_items": sold + unsold,
+    }
+    manifest = {
+        "scale": scale,
+        "seed": seed,
+        "zipf": zipf,
+        "unsold_ratio": unsold_ratio,
+        "chunk_orders": chunk_orders,
+        "status_mix": STATUS_MIX,
+        "items_per_order": ITEMS_PER_ORDER,
+        "rows": rows,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return rows
+
+def scale_name(scale: float) -> str:
+    return f"sf{scale:g}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic e-commerce dataset")
+    parser.add_argument("--scale", type=float, default=1.0, help="scale factor (1 = about 125k orders)")
+    parser.add_argument("--out", help="output directory (default: data/sf<scale>)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--zipf", type=float, default=ZIPF_EXPONENT, help="Zipf exponent of product popularity")
+    parser.add_argument("--unsold-ratio", type=float, default=UNSOLD_RATIO, help="unsold share of inventory items")
+    parser.add_argument("--chunk-orders", type=int, default=CHUNK_ORDERS, help="orders generated per chunk")
+    parser.add_argument("--load", action="store_true", help="load the CSVs into DATABASE_URL with load_data.py")
+    parser.add_argument("--mode", choices=["bulk", "parallel"], default="bulk", help="load_data.py mode for --load")
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join("data", scale_name(args.scale))
+    start = time.perf_counter()
+    rows = generate(out_dir, args.scale, args.seed, args.zipf, args.unsold_ratio, args.chunk_orders)
+    print(f"Generated {scale_name(args.scale)} in {out_dir} ({time.perf_counter() - start:.1f}s)")
+    for table, count in rows.items():
+        print(f"  {table:<22} {count:>12,}")
+
+    if args.load:
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "load_data.py"), "--data-dir",
+                        os.path.abspath(out_dir), "--mode", args.mode], cwd=BACKEND_DIR, check=True)
+
+if __name__ == "__main__":
+    main()
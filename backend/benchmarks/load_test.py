@@ -0,0 +1,374 @@
+"""Load test the API with a mixed chat and REST workload against a fake LLM
+
+Usage (from the backend directory, with DATABASE_URL pointing at a loaded database):
+
+    python benchmarks/load_test.py --concurrency 1,8,32 --duration 30 --output load.json
+    python benchmarks/load_test.py --llm-latency-ms 800 --compare load.json
+    python benchmarks/load_test.py --target http://localhost:8000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMConfig, start_server
+
+GENERAL_MESSAGES = [
+    "Hi, what can you help me with?",
+    "What is your return policy?",
+    "How long does shipping usually take?",
+    "Can I change the address on my order?",
+    "Thanks for the help!",
+]
+PRODUCT_WORDS = ["black hoodie", "slim fit jeans", "summer dress", "wool sweater", "running shorts", "denim jacket"]
+
+# (scenario, weight); weights are relative
+WORKLOAD = [
+    ("chat_order_status", 20),
+    ("chat_stock", 20),
+    ("chat_product", 15),
+    ("chat_general", 10),
+    ("chat_stream", 5),
+    ("rest_top_products", 10),
+    ("rest_order", 8),
+    ("rest_stock", 5),
+    ("rest_search", 5),
+    ("rest_analytics", 2),
+]
+
+# Responses from admission control: counted as shed, not as errors
+SHED_STATUS = {429, 503}
+
+def sample_entities(database_url: Optional[str], limit: int = 500) -> Tuple[List[Any], List[str]]:
+    """Order IDs and product names to put in requests"""
+    order_ids, product_names = [], []
+    if database_url:
+        try:
+            from sqlalchemy import create_engine, text
+
+            engine = create_engine(database_url)
+            with engine.connect() as connection:
+                order_ids = [row[0] for row in connection.execute(
+                    text("SELECT order_id FROM orders ORDER BY order_id LIMIT :limit"), {"limit": limit})]
+                product_names = [row[0] for row in connection.execute(
+                    text("SELECT name FROM products WHERE name IS NOT NULL ORDER BY id LIMIT :limit"), {"limit": limit})]
+            engine.dispose()
+        except Exception as e:
+            print(f"Error sampling entities from the database: {e}")
+    return order_ids or list(range(1, limit + 1)), product_names or ["Classic T-Shirt", "Slim Fit Jeans"]
+
+class Workload:
+    """Builds the next request of the mix; one per client so clients do not share a random stream"""
+
+    def __init__(self, order_ids: List[Any], product_names: List[str], seed: int):
+        self.order_ids = order_ids
+        self.product_names = product_names
+        self.random = random.Random(seed)
+        self.scenarios = [name for name, _ in WORKLOAD]
+        self.weights = [weight for _, weight in WORKLOAD]
+        self.conversation_id: Optional[str] = None
+
+    def _chat_message(self, kind: str) -> str:
+        if kind == "order_status":
+            return f"What is the status of order {self.random.choice(self.order_ids)}?"
+        if kind == "stock":
+            return f"Is the {self.random.choice(self.product_names)} in stock?"
+        if kind == "product":
+            if self.random.random() < 0.4:
+                return "What are the top 5 most sold products?"
+            return f"Do you have any {self.random.choice(PRODUCT_WORDS)} products?"
+        return self.random.choice(GENERAL_MESSAGES)
+
+    def _chat_body(self, kind: str) -> Dict[str, Any]:
+        # About a third of messages continue the client's conversation, so history is read
+        if self.conversation_id is None or self.random.random() > 0.3:
+            self.conversation_id = str(uuid.uuid4())
+        return {"message": self._chat_message(kind), "conversation_id": self.conversation_id}
+
+    def next(self) -> Tuple[str, str, str, Optional[Dict[str, Any]]]:
+        """(scenario, method, path, JSON body)"""
+        scenario = self.random.choices(self.scenarios, self.weights)[0]
+        if scenario == "chat_stream":
+            kind = self.random.choice(["order_status", "stock", "product", "general"])
+            return scenario, "POST", "/api/chat/stream", self._chat_body(kind)
+        if scenario.startswith("chat_"):
+            return scenario, "POST", "/api/chat", self._chat_body(scenario[len("chat_"):])
+        if scenario == "rest_top_products":
+            return scenario, "GET", "/api/products/top?limit=5", None
+        if scenario == "rest_order":
+            return scenario, "GET", f"/api/orders/{self.random.choice(self.order_ids)}", None
+        if scenario == "rest_stock":
+            return scenario, "GET", f"/api/products/stock/{self.random.choice(self.product_names)}", None
+        if scenario == "rest_search":
+            return scenario, "GET", f"/api/products/search?q={self.random.choice(PRODUCT_WORDS)}", None
+        return scenario, "GET", "/api/analytics/sales", None
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def summarize(latencies: List[float], errors: int, seconds: float, shed: int = 0) -> Dict[str, Any]:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "shed": shed,
+        "throughput_rps": round(len(values) / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+async def send(client: httpx.AsyncClient, method: str, path: str, body: Optional[Dict[str, Any]],
+               stream: bool) -> Tuple[int, Optional[float]]:
+    """(status code, seconds to the first streamed token)"""
+    if not stream:
+        response = await client.request(method, path, json=body)
+        return response.status_code, None
+
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream(method, path, json=body) as response:
+        if response.status_code >= 400:
+            await response.aread()
+            return response.status_code, None
+        async for line in response.aiter_lines():
+            if first_token is None and line.startswith("event: token"):
+                first_token = time.perf_counter() - start
+    return response.status_code, first_token
+
+async def run_level(base_url: str, concurrency: int, duration: float, warmup: float,
+                    order_ids: List[Any], product_names: List[str], seed: int,
+                    request_timeout: float) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    shed: Dict[str, int] = {}
+    first_tokens: List[float] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=request_timeout, limits=limits) as client:
+        measuring = {"on": False}
+
+        async def client_loop(index: int, stop_at: float):
+            workload = Workload(order_ids, product_names, seed * 1000 + index)
+            while time.perf_counter() < stop_at:
+                scenario, method, path, body = workload.next()
+                start = time.perf_counter()
+                try:
+                    status, first_token = await send(client, method, path, body, scenario == "chat_stream")
+                except Exception:
+                    status, first_token = None, None
+                elapsed = time.perf_counter() - start
+                if not measuring["on"]:
+                    continue
+                if status is not None and status < 400:
+                    latencies.setdefault(scenario, []).append(elapsed)
+                    if first_token is not None:
+                        first_tokens.append(first_token)
+                elif status in SHED_STATUS:
+                    shed[scenario] = shed.get(scenario, 0) + 1
+                else:
+                    errors[scenario] = errors.get(scenario, 0) + 1
+
+        if warmup > 0:
+            await asyncio.gather(*(client_loop(i, time.perf_counter() + warmup) for i in range(concurrency)))
+
+        measuring["on"] = True
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(i, started + duration) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    scenarios = sorted(set(latencies) | set(errors) | set(shed))
+    endpoints = {
+        name: summarize(latencies.get(name, []), errors.get(name, 0), elapsed, shed.get(name, 0)) for name in scenarios
+    }
+    if first_tokens:
+        endpoints["chat_stream:first_token"] = summarize(first_tokens, 0, elapsed)
+    every = [value for values in latencies.values() for value in values]
+    return {
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "overall": summarize(every, sum(errors.values()), elapsed, sum(shed.values())),
+        "endpoints": endpoints,
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_backend(port: int, workers: int, env: Dict[str, str]) -> subprocess.Popen:
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+def wait_until_ready(base_url: str, process: Optional[subprocess.Popen], timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Backend at {base_url} did not become ready within {timeout:.0f}s")
+
+def server_stats(base_url: str) -> Dict[str, Any]:
+    stats = {}
+    for name, path in [("single_flight", "/api/single-flight/stats"), ("response_cache", "/api/cache/stats"),
+                       ("prompt", "/api/prompt/stats"), ("conversation_log", "/api/conversation-log/stats"),
+                       ("admission", "/api/admission/stats"), ("llm", "/api/llm/status")]:
+        try:
+            stats[name] = httpx.get(f"{base_url}{path}", timeout=5).json()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+    return stats
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def print_report(report: Dict[str, Any]):
+    for level in report["levels"]:
+        overall = level["overall"]
+        print(f"\nconcurrency {level['concurrency']}: {overall['throughput_rps']} req/s, "
+              f"{overall['errors']} errors, {overall.get('shed', 0)} shed, p50 {overall['p50_ms']}ms p95 {overall['p95_ms']}ms p99 {overall['p99_ms']}ms")
+        print(f"  {'scenario':<26} {'requests':>8} {'errors':>6} {'shed':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, result in level["endpoints"].items():
+            print(f"  {name:<26} {result['requests']:>8} {result['errors']:>6} {result.get('shed', 0):>6} {result['throughput_rps']:>8} "
+                  f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}")
+
+def print_comparison(report: Dict[str, Any], baseline: Dict[str, Any]):
+    """p95 and throughput changes against a previous report, per level and scenario"""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print(f"\nCompared with {baseline.get('meta', {}).get('revision') or 'baseline'}:")
+    for level in report["levels"]:
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        print(f"  concurrency {level['concurrency']}")
+        for name, result in [("overall", level["overall"]), *level["endpoints"].items()]:
+            old = before["overall"] if name == "overall" else before["endpoints"].get(name)
+            if not old or not old["p95_ms"]:
+                continue
+            change = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            print(f"    {name:<26} p95 {old['p95_ms']:>9} -> {result['p95_ms']:>9} ms ({change:+.1f}%)  "
+                  f"rps {old['throughput_rps']} -> {result['throughput_rps']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-workload load test with a local fake LLM")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before each level")
+    parser.add_argument("--target", help="base URL of a running backend (default: start one)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started backend")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--llm-token-delay-ms", type=float, default=10.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true", help="disable the LLM response cache in the started backend")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    args = parser.parse_args()
+
+    levels = [int(value) for value in args.concurrency.split(",") if value.strip()]
+    database_url = os.getenv("DATABASE_URL")
+    order_ids, product_names = sample_entities(database_url)
+
+    fake_config = FakeLLMConfig(args.llm_latency_ms, args.llm_jitter_ms, args.llm_token_delay_ms,
+                                error_rate=args.llm_error_rate, seed=args.seed)
+    fake_server = None
+    process = None
+    base_url = args.target.rstrip("/") if args.target else None
+    try:
+        if base_url is None:
+            fake_server = start_server(fake_config)
+            fake_host, fake_port = fake_server.server_address[:2]
+            env = dict(os.environ)
+            env["GROQ_BASE_URL"] = f"http://{fake_host}:{fake_port}"
+            env.setdefault("GROQ_API_KEY", "load-test")
+            # Every client comes from one IP, so the per-client chat rate limit would shed most of the load
+            env.setdefault("CHAT_RATE_PER_MINUTE", "0")
+            if args.no_cache:
+                env["RESPONSE_CACHE_BACKEND"] = "none"
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            process = start_backend(port, args.workers, env)
+        wait_until_ready(base_url, process)
+
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "started_at": datetime.utcnow().isoformat(),
+                "target": args.target or "local",
+                "workers": args.workers if not args.target else None,
+                "duration_seconds": args.duration,
+                "warmup_seconds": args.warmup,
+                "seed": args.seed,
+                "workload": dict(WORKLOAD),
+                "fake_llm": None if args.target else {
+                    "latency_ms": args.llm_latency_ms,
+                    "jitter_ms": args.llm_jitter_ms,
+                    "token_delay_ms": args.llm_token_delay_ms,
+                    "error_rate": args.llm_error_rate,
+                },
+                "response_cache": "disabled" if args.no_cache else "default",
+            },
+            "levels": [],
+        }
+        for concurrency in levels:
+            print(f"Running {concurrency} clients for {args.duration:.0f}s...")
+            report["levels"].append(asyncio.run(run_level(
+                base_url, concurrency, args.duration, args.warmup, order_ids, product_names,
+                args.seed, args.timeout
+            )))
+        report["server"] = server_stats(base_url)
+        if fake_server is not None:
+            report["fake_llm_requests"] = fake_config.stats()
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if fake_server is not None:
+            fake_server.shutdown()
+
+    print_report(report)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+if __name__ == "__main__":
+    main()
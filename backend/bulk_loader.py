@@ -0,0 +1,90 @@
+import io
+import time
+from contextlib import ExitStack
+from typing import Dict, Any, Iterable, List
+
+import pandas as pd
+from sqlalchemy.engine import Connection, Engine
+
+from database import engine as default_engine
+from table_schemas import TABLE_MODELS, RejectWriter, apply_schema, frame_records, read_csv_kwargs
+
+def supports_copy(bind: Engine) -> bool:
+    return bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+
+def copy_frame(connection: Connection, table_name: str, frame: pd.DataFrame):
+    """Stream a prepared chunk into PostgreSQL with COPY FROM STDIN"""
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False, na_rep="\\N", date_format="%Y-%m-%d %H:%M:%S.%f")
+    buffer.seek(0)
+
+    columns = ", ".join(frame.columns)
+    sql = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+def insert_frame(connection: Connection, table_name: str, frame: pd.DataFrame):
+    """Batch insert a prepared chunk with a single executemany (non-PostgreSQL fallback)"""
+    connection.execute(TABLE_MODELS[table_name].__table__.insert(), frame_records(frame))
+
+def load_chunks(table_name: str, chunks: Iterable[pd.DataFrame], bind: Engine = None,
+                reject_writer: RejectWriter = None, description: str = None,
+                single_transaction: bool = False) -> Dict[str, Any]:
+    """Bulk load raw CSV chunks into a table, committing per chunk unless single_transaction is set"""
+    bind = bind or default_engine
+    reject_writer = reject_writer or RejectWriter()
+    use_copy = supports_copy(bind)
+    method = "copy" if use_copy else "executemany"
+    write = copy_frame if use_copy else insert_frame
+    print(f"Bulk loading {table_name} from {description or 'stream'} ({method})...")
+
+    total_loaded = 0
+    total_read = 0
+    start = time.perf_counter()
+
+    with ExitStack() as stack:
+        shared_connection = stack.enter_context(bind.begin()) if single_transaction else None
+
+        for chunk in chunks:
+            frame, rejects = apply_schema(table_name, chunk)
+            reject_writer.write(table_name, rejects)
+            total_read += len(chunk)
+            if frame.empty:
+                continue
+
+            if shared_connection is not None:
+                write(shared_connection, table_name, frame)
+            else:
+                with bind.begin() as connection:
+                    write(connection, table_name, frame)
+                print(f"Committed chunk. Total loaded so far: {total_loaded + len(frame)}")
+            total_loaded += len(frame)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "table": table_name,
+        "method": method,
+        "rows": total_loaded,
+        "rejected": total_read - total_loaded,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(total_loaded / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    print(f"Successfully loaded {total_loaded} rows into {table_name} ({stats['rows_per_sec']} rows/sec)")
+    return stats
+
+def load_table(table_name: str, csv_path: str, bind: Engine = None, chunk_size: int = 50000,
+               reject_writer: RejectWriter = None) -> Dict[str, Any]:
+    """Bulk load one CSV file into its table and return throughput stats"""
+    chunks = pd.read_csv(csv_path, chunksize=chunk_size, **read_csv_kwargs(table_name))
+    return load_chunks(table_name, chunks, bind=bind, reject_writer=reject_writer, description=csv_path)
+
+def print_throughput_report(results: List[Dict[str, Any]]):
+    """Print a rows/sec summary per table"""
+    print(f"\n{'table':<22}{'method':<14}{'rows':>12}{'seconds':>10}{'rows/sec':>12}")
+    for stats in results:
+        print(f"{stats['table']:<22}{stats['method']:<14}{stats['rows']:>12}"
+              f"{stats['seconds']:>10}{stats['rows_per_sec']:>12}")
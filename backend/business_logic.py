@@ -1,43 +1,57 @@
-from sqlalchemy.orm import Session
-from database import Product, Order, OrderItem, User, InventoryItem
+from sqlalchemy.orm import Session, joinedload
+from database import (
+    SessionLocal, Product, Order, OrderItem, User, InventoryItem,
+    ProductSalesRollup, CategorySalesRollup, SalesSummary, ProductStock
+)
 from typing import List, Dict, Any
+import asyncio
+import logging
+import entity_recognizer
+import metrics
+import product_search
+import single_flight
 import re
 from sqlalchemy import func, desc
 
+logger = logging.getLogger(__name__)
+
 class BusinessLogicService:
     def __init__(self, db: Session):
         self.db = db
     
+    # Rollups are never emptied once built, so a positive check is kept for the process
+    _rollups_built = False
+    
+    def _rollups_ready(self) -> bool:
+        """The sales rollups exist once sales_summary has its row"""
+        if not BusinessLogicService._rollups_built:
+            BusinessLogicService._rollups_built = \
+                self.db.query(SalesSummary.id).filter(SalesSummary.id == 1).first() is not None
+        return BusinessLogicService._rollups_built
+    
+    @metrics.timed(metrics.BUSINESS_DURATION)
     def get_top_products(self, limit: int = 5) -> List[Dict[str, Any]]:
         """Get top selling products based on order quantity"""
         try:
-            # Query to get products with their total sold quantities
-            result = self.db.query(
-                Product.id,
-                Product.name,
-                Product.category,
-                Product.brand,
-                Product.retail_price,
-                Product.department,
-                func.count(OrderItem.id).label('total_orders'),
-                func.sum(OrderItem.sale_price).label('total_revenue')
-            ).join(OrderItem, Product.id == OrderItem.product_id)\
-             .filter(OrderItem.status == 'Complete')\
-             .group_by(Product.id)\
-             .order_by(desc('total_orders'))\
-             .limit(limit)\
-             .all()
+            if not self._rollups_ready():
+                return self._get_top_products_live(limit)
+            
+            # Read from the maintained rollup (index on completed_orders)
+            result = self.db.query(ProductSalesRollup)\
+                .order_by(desc(ProductSalesRollup.completed_orders))\
+                .limit(limit)\
+                .all()
             
             return [
                 {
-                    "product_id": row.id,
-                    "product_name": row.name,
+                    "product_id": row.product_id,
+                    "product_name": row.product_name,
                     "category": row.category,
                     "brand": row.brand,
                     "retail_price": row.retail_price,
                     "department": row.department,
-                    "total_orders": row.total_orders,
-                    "total_revenue": row.total_revenue
+                    "total_orders": row.completed_orders,
+                    "total_revenue": row.revenue
                 }
                 for row in result
             ]
@@ -45,19 +59,56 @@ class BusinessLogicService:
             print(f"Error getting top products: {e}")
             return []
     
+    def _get_top_products_live(self, limit: int) -> List[Dict[str, Any]]:
+        """Aggregate order_items directly (used until the rollups are first built)"""
+        # Query to get products with their total sold quantities
+        result = self.db.query(
+            Product.id,
+            Product.name,
+            Product.category,
+            Product.brand,
+            Product.retail_price,
+            Product.department,
+            func.count(OrderItem.id).label('total_orders'),
+            func.sum(OrderItem.sale_price).label('total_revenue')
+        ).join(OrderItem, Product.id == OrderItem.product_id)\
+         .filter(OrderItem.status == 'Complete')\
+         .group_by(Product.id)\
+         .order_by(desc('total_orders'))\
+         .limit(limit)\
+         .all()
+        
+        return [
+            {
+                "product_id": row.id,
+                "product_name": row.name,
+                "category": row.category,
+                "brand": row.brand,
+                "retail_price": row.retail_price,
+                "department": row.department,
+                "total_orders": row.total_orders,
+                "total_revenue": row.total_revenue
+            }
+            for row in result
+        ]
+    
+    @metrics.timed(metrics.BUSINESS_DURATION)
     def get_order_status(self, order_id: str) -> Dict[str, Any]:
         """Get order status by order ID"""
         try:
-            order = self.db.query(Order).filter(Order.order_id == int(order_id)).first()
+            # Order, customer, items and their products in one round-trip
+            order = self.db.query(Order)\
+                .options(
+                    joinedload(Order.user),
+                    joinedload(Order.items).joinedload(OrderItem.product)
+                )\
+                .filter(Order.order_id == int(order_id))\
+                .first()
             
             if not order:
                 return {"error": "Order not found"}
             
-            # Get order items
-            order_items = self.db.query(OrderItem).filter(OrderItem.order_id == int(order_id)).all()
-            
-            # Get user information
-            user = self.db.query(User).filter(User.id == order.user_id).first()
+            user = order.user
             
             return {
                 "order_id": order.order_id,
@@ -72,28 +123,33 @@ class BusinessLogicService:
                 "items": [
                     {
                         "product_id": item.product_id,
+                        "product_name": item.product.name if item.product else None,
                         "status": item.status,
                         "sale_price": item.sale_price,
                         "created_at": item.created_at,
                         "shipped_at": item.shipped_at,
                         "delivered_at": item.delivered_at
                     }
-                    for item in order_items
+                    for item in sorted(order.items, key=lambda item: item.id)
                 ]
             }
         except Exception as e:
             print(f"Error getting order status: {e}")
             return {"error": "Failed to retrieve order information"}
     
+    @metrics.timed(metrics.BUSINESS_DURATION)
     def get_product_stock(self, product_name: str = None, product_id: str = None) -> Dict[str, Any]:
         """Get stock information for a product"""
         try:
             query = self.db.query(Product)
             
+            if not product_id and product_name:
+                product_id = self.resolve_product_id(product_name)
+            
             if product_id:
-                product = query.filter(Product.id == int(product_id)).first()
+                product = self.db.get(Product, int(product_id))
             elif product_name:
-                # Case-insensitive search
+                # Case-insensitive search when the name is not a catalog entity
                 product = query.filter(Product.name.ilike(f"%{product_name}%")).first()
             else:
                 return {"error": "Product name or ID required"}
@@ -101,11 +157,15 @@ class BusinessLogicService:
             if not product:
                 return {"error": "Product not found"}
             
-            # Get inventory information
-            inventory_count = self.db.query(InventoryItem).filter(
-                InventoryItem.product_id == product.id,
-                InventoryItem.sold_at.is_(None)
-            ).count()
+            # Primary-key lookup in the maintained stock summary
+            stock = self.db.get(ProductStock, product.id)
+            if stock is not None:
+                inventory_count = stock.available_units
+            else:
+                inventory_count = self.db.query(InventoryItem).filter(
+                    InventoryItem.product_id == product.id,
+                    InventoryItem.sold_at.is_(None)
+                ).count()
             
             return {
                 "product_id": product.id,
@@ -121,15 +181,18 @@ class BusinessLogicService:
             print(f"Error getting product stock: {e}")
             return {"error": "Failed to retrieve product information"}
     
-    def search_products(self, query: str) -> List[Dict[str, Any]]:
-        """Search products by name, category, or brand"""
+    @metrics.timed(metrics.BUSINESS_DURATION)
+    def search_products(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search products by name, category, brand or department, best matches first"""
         try:
-            products = self.db.query(Product).filter(
-                (Product.name.ilike(f"%{query}%")) |
-                (Product.category.ilike(f"%{query}%")) |
-                (Product.brand.ilike(f"%{query}%"))
-            ).limit(10).all()
+            matches = product_search.search_index.get(self.db).search(query, limit)
+            if not matches:
+                return []
             
+            products = {
+                product.id: product
+                for product in self.db.query(Product).filter(Product.id.in_([pid for pid, _ in matches])).all()
+            }
             return [
                 {
                     "product_id": product.id,
@@ -138,29 +201,34 @@ class BusinessLogicService:
                     "brand": product.brand,
                     "retail_price": product.retail_price,
                     "department": product.department,
-                    "sku": product.sku
+                    "sku": product.sku,
+                    "score": score
                 }
-                for product in products
+                for product, score in ((products.get(pid), score) for pid, score in matches)
+                if product is not None
             ]
         except Exception as e:
             print(f"Error searching products: {e}")
             return []
     
+    @metrics.timed(metrics.BUSINESS_DURATION)
     def get_low_stock_products(self, threshold: int = 10) -> List[Dict[str, Any]]:
         """Get products with low stock"""
         try:
-            # Get products with low available inventory
+            if self.db.query(ProductStock.product_id).first() is None:
+                return self._get_low_stock_products_live(threshold)
+            
+            # Range scan on the available_units index, out-of-stock products included
             result = self.db.query(
                 Product.id,
                 Product.name,
                 Product.category,
                 Product.brand,
                 Product.retail_price,
-                func.count(InventoryItem.id).label('available_stock')
-            ).join(InventoryItem, Product.id == InventoryItem.product_id)\
-             .filter(InventoryItem.sold_at.is_(None))\
-             .group_by(Product.id)\
-             .having(func.count(InventoryItem.id) <= threshold)\
+                ProductStock.available_units.label('available_stock')
+            ).join(Product, Product.id == ProductStock.product_id)\
+             .filter(ProductStock.available_units <= threshold)\
+             .order_by(ProductStock.available_units, Product.id)\
              .all()
             
             return [
@@ -178,42 +246,93 @@ class BusinessLogicService:
             print(f"Error getting low stock products: {e}")
             return []
     
+    def _get_low_stock_products_live(self, threshold: int) -> List[Dict[str, Any]]:
+        """Count inventory_items directly (used until product_stock is first built)"""
+        result = self.db.query(
+            Product.id,
+            Product.name,
+            Product.category,
+            Product.brand,
+            Product.retail_price,
+            func.count(InventoryItem.id).label('available_stock')
+        ).join(InventoryItem, Product.id == InventoryItem.product_id)\
+         .filter(InventoryItem.sold_at.is_(None))\
+         .group_by(Product.id)\
+         .having(func.count(InventoryItem.id) <= threshold)\
+         .all()
+        
+        return [
+            {
+                "product_id": row.id,
+                "product_name": row.name,
+                "category": row.category,
+                "brand": row.brand,
+                "retail_price": row.retail_price,
+                "available_stock": row.available_stock
+            }
+            for row in result
+        ]
+    
+    @metrics.timed(metrics.BUSINESS_DURATION)
     def get_sales_analytics(self) -> Dict[str, Any]:
         """Get sales analytics"""
         try:
-            # Total revenue
-            total_revenue = self.db.query(func.sum(OrderItem.sale_price))\
-                .filter(OrderItem.status == 'Complete').scalar() or 0
+            summary = self.db.query(SalesSummary).filter(SalesSummary.id == 1).first()
+            if not summary:
+                return self._get_sales_analytics_live()
             
-            # Total orders
-            total_orders = self.db.query(func.count(Order.id)).scalar() or 0
+            top_category = self.db.query(CategorySalesRollup)\
+                .order_by(desc(CategorySalesRollup.completed_orders))\
+                .first()
             
-            # Completed orders
-            completed_orders = self.db.query(func.count(Order.id))\
-                .filter(Order.status == 'Complete').scalar() or 0
-            
-            # Top category
-            top_category = self.db.query(
-                Product.category,
-                func.count(OrderItem.id).label('order_count')
-            ).join(OrderItem, Product.id == OrderItem.product_id)\
-             .filter(OrderItem.status == 'Complete')\
-             .group_by(Product.category)\
-             .order_by(desc('order_count'))\
-             .first()
+            total_orders = summary.total_orders or 0
+            completed_orders = summary.completed_orders or 0
             
             return {
-                "total_revenue": total_revenue,
+                "total_revenue": summary.total_revenue or 0,
                 "total_orders": total_orders,
                 "completed_orders": completed_orders,
                 "completion_rate": (completed_orders / total_orders * 100) if total_orders > 0 else 0,
                 "top_category": top_category.category if top_category else "N/A",
-                "top_category_orders": top_category.order_count if top_category else 0
+                "top_category_orders": top_category.completed_orders if top_category else 0,
+                "refreshed_at": summary.refreshed_at
             }
         except Exception as e:
             print(f"Error getting sales analytics: {e}")
             return {}
     
+    def _get_sales_analytics_live(self) -> Dict[str, Any]:
+        """Aggregate the base tables directly (used until the rollups are first built)"""
+        # Total revenue
+        total_revenue = self.db.query(func.sum(OrderItem.sale_price))\
+            .filter(OrderItem.status == 'Complete').scalar() or 0
+        
+        # Total orders
+        total_orders = self.db.query(func.count(Order.id)).scalar() or 0
+        
+        # Completed orders
+        completed_orders = self.db.query(func.count(Order.id))\
+            .filter(Order.status == 'Complete').scalar() or 0
+        
+        # Top category
+        top_category = self.db.query(
+            Product.category,
+            func.count(OrderItem.id).label('order_count')
+        ).join(OrderItem, Product.id == OrderItem.product_id)\
+         .filter(OrderItem.status == 'Complete')\
+         .group_by(Product.category)\
+         .order_by(desc('order_count'))\
+         .first()
+        
+        return {
+            "total_revenue": total_revenue,
+            "total_orders": total_orders,
+            "completed_orders": completed_orders,
+            "completion_rate": (completed_orders / total_orders * 100) if total_orders > 0 else 0,
+            "top_category": top_category.category if top_category else "N/A",
+            "top_category_orders": top_category.order_count if top_category else 0
+        }
+    
     def extract_order_id(self, message: str) -> str:
         """Extract order ID from message"""
         # Look for patterns like "order 12345" or "order ID 12345"
@@ -230,6 +349,22 @@ class BusinessLogicService:
         
         return None
     
+    def find_entities(self, message: str) -> List[Dict[str, Any]]:
+        """Catalog product names, SKUs, brands and categories mentioned in a message"""
+        try:
+            return entity_recognizer.recognizer.get(self.db).find(message)
+        except Exception as e:
+            logger.error("Error recognizing entities: %s", e)
+            return []
+    
+    def resolve_product_id(self, message: str) -> int:
+        """ID of the product a message names by full name or SKU"""
+        try:
+            return entity_recognizer.recognizer.get(self.db).resolve_product(message)
+        except Exception as e:
+            logger.error("Error resolving product: %s", e)
+            return None
+    
     def extract_product_name(self, message: str) -> str:
         """Extract product name from message"""
         # Common clothing terms
@@ -245,4 +380,56 @@ class BusinessLogicService:
             if term in message_lower:
                 return term
         
-        return None 
\ No newline at end of file
+        return None
+
+
+def _run_isolated(bind, method: str, args: tuple):
+    """Run one BusinessLogicService method on a session of its own"""
+    db = SessionLocal(bind=bind)
+    try:
+        return getattr(BusinessLogicService(db), method)(*args)
+    finally:
+        db.close()
+
+
+class AsyncBusinessLogicService:
+    """Async wrapper that runs each BusinessLogicService query on its own session in a worker thread"""
+
+    def __init__(self, db: Session):
+        self.service = BusinessLogicService(db)
+
+    async def _call(self, method: str, *args):
+        bind = self.service.db.get_bind()
+        if not single_flight.SINGLE_FLIGHT_ENABLED:
+            return await asyncio.to_thread(_run_isolated, bind, method, args)
+        return await single_flight.business_flight.do(
+            (str(bind.url), method, args),
+            lambda: asyncio.to_thread(_run_isolated, bind, method, args)
+        )
+
+    async def get_top_products(self, limit: int = 5) -> List[Dict[str, Any]]:
+        return await self._call("get_top_products", limit)
+
+    async def get_order_status(self, order_id: str) -> Dict[str, Any]:
+        return await self._call("get_order_status", order_id)
+
+    async def get_product_stock(self, product_name: str = None, product_id: str = None) -> Dict[str, Any]:
+        return await self._call("get_product_stock", product_name, product_id)
+
+    async def search_products(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return await self._call("search_products", query, limit)
+
+    async def get_low_stock_products(self, threshold: int = 10) -> List[Dict[str, Any]]:
+        return await self._call("get_low_stock_products", threshold)
+
+    async def get_sales_analytics(self) -> Dict[str, Any]:
+        return await self._call("get_sales_analytics")
+
+    def extract_order_id(self, message: str) -> str:
+        return self.service.extract_order_id(message)
+
+    async def resolve_product_id(self, message: str) -> int:
+        return await self._call("resolve_product_id", message)
+
+    def extract_product_name(self, message: str) -> str:
+        return self.service.extract_product_name(message)
@@ -0,0 +1,195 @@
+"""Compact, token-budgeted prompt context for the chat LLM"""
+import json
+import math
+import os
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_HISTORY_TURNS = int(os.getenv("CONTEXT_HISTORY_TURNS", "4"))
+# Longest user or assistant text kept per history turn
+HISTORY_MAX_CHARS = 400
+
+# Chat-format overhead per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / 4) if text else 0
+
+def _value(value: Any) -> str:
+    if value is None or value == "":
+        return "-"
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value).replace("|", "/").replace("\n", " ")
+
+# Context key -> (label, priority, fields for a record, or (columns, fields) for a list)
+RECORD_SECTIONS = {
+    "order_info": ("order", 1, [
+        ("id", "order_id"), ("status", "status"), ("customer", "user_name"), ("placed", "created_at"),
+        ("shipped", "shipped_at"), ("delivered", "delivered_at"), ("returned", "returned_at"),
+        ("items", "num_of_items"),
+    ]),
+    "stock_info": ("stock", 1, [
+        ("product", "product_name"), ("brand", "brand"), ("category", "category"),
+        ("available", "available_stock"), ("price", "retail_price"), ("sku", "sku"),
+    ]),
+}
+
+LIST_SECTIONS = {
+    "order_items": ("order items", 2, ["product", "status", "price"], ["product_name", "status", "sale_price"]),
+    "top_products": ("top products", 2, ["product", "brand", "sold", "price"],
+                     ["product_name", "brand", "total_orders", "retail_price"]),
+    "products": ("matching products", 2, ["product", "brand", "category", "price"],
+                 ["product_name", "brand", "category", "retail_price"]),
+}
+
+ERROR_PRIORITY = 0
+OTHER_PRIORITY = 3
+
+def _record_line(label: str, record: Dict[str, Any], fields: List[Tuple[str, str]]) -> str:
+    pairs = [f"{name}={_value(record.get(key))}" for name, key in fields if record.get(key) not in (None, "")]
+    return f"{label}: " + " ".join(pairs)
+
+def _list_lines(label: str, rows: List[Dict[str, Any]], columns: List[str], fields: List[str]) -> Tuple[str, List[str]]:
+    header = f"{label} ({'|'.join(columns)}):"
+    return header, ["|".join(_value(row.get(field)) for field in fields) for row in rows]
+
+def encode_sections(context: Dict[str, Any]) -> List[Tuple[int, str, List[str]]]:
+    """(priority, header, rows) per context entry"""
+    sections = []
+    for key, value in context.items():
+        if key.endswith("_error"):
+            sections.append((ERROR_PRIORITY, f"{key.replace('_', ' ')}: {value}", []))
+        elif key in RECORD_SECTIONS and isinstance(value, dict):
+            label, priority, fields = RECORD_SECTIONS[key]
+            sections.append((priority, _record_line(label, value, fields), []))
+            # An order's items are a list section of their own
+            if key == "order_info" and value.get("items"):
+                label, priority, columns, fields = LIST_SECTIONS["order_items"]
+                header, rows = _list_lines(label, value["items"], columns, fields)
+                sections.append((priority, header, rows))
+        elif key in LIST_SECTIONS and isinstance(value, list):
+            label, priority, columns, fields = LIST_SECTIONS[key]
+            if not value:
+                sections.append((priority, f"{label}: none", []))
+            else:
+                header, rows = _list_lines(label, value, columns, fields)
+                sections.append((priority, header, rows))
+        else:
+            sections.append((OTHER_PRIORITY, f"{key}: {json.dumps(value, default=str, separators=(',', ':'))}", []))
+    return sections
+
+def _clip(text: str) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= HISTORY_MAX_CHARS else text[:HISTORY_MAX_CHARS - 3] + "..."
+
+def encode_context(context: Optional[Dict[str, Any]], history: Optional[List[Dict[str, Any]]] = None,
+                   budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, List[Dict[str, str]], Dict[str, Any]]:
+    """Context text and history messages within the token budget, plus a report of what was kept"""
+    remaining = budget
+    lines: List[str] = []
+    report = {"budget": budget, "sections": 0, "rows_dropped": 0, "sections_dropped": [], "history_turns": 0}
+
+    for _, header, rows in sorted(encode_sections(context or {}), key=lambda section: section[0]):
+        cost = estimate_tokens(header) + 1
+        if cost > remaining:
+            report["sections_dropped"].append(header.split(":")[0])
+            continue
+        lines.append(header)
+        remaining -= cost
+        report["sections"] += 1
+        for i, row in enumerate(rows):
+            cost = estimate_tokens(row) + 1
+            marker = f"(+{len(rows) - i} more)"
+            # Always leave room for the marker in case a later row does not fit
+            if cost + estimate_tokens(marker) + 1 > remaining and i < len(rows) - 1 or cost > remaining:
+                lines.append(marker)
+                remaining -= estimate_tokens(marker) + 1
+                report["rows_dropped"] += len(rows) - i
+                break
+            lines.append(row)
+            remaining -= cost
+
+    # Newest turns first until the budget or window runs out, then back into chronological order
+    history_messages: List[Dict[str, str]] = []
+    for turn in reversed((history or [])[-CONTEXT_HISTORY_TURNS:] if CONTEXT_HISTORY_TURNS > 0 else []):
+        pair = [
+            {"role": "user", "content": _clip(turn.get("user_message"))},
+            {"role": "assistant", "content": _clip(turn.get("ai_response"))},
+        ]
+        cost = sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in pair)
+        if cost > remaining:
+            break
+        history_messages = pair + history_messages
+        remaining -= cost
+        report["history_turns"] += 1
+
+    report["context_tokens"] = budget - remaining
+    return "\n".join(lines), history_messages, report
+
+# Items listed per section in a plain-text answer
+DESCRIBE_MAX_ITEMS = 5
+
+def _price(value: Any) -> str:
+    return f"${value:.2f}" if isinstance(value, (int, float)) else "-"
+
+def _bullets(rows: List[Dict[str, Any]], line) -> List[str]:
+    lines = [f"- {line(row)}" for row in rows[:DESCRIBE_MAX_ITEMS]]
+    if len(rows) > DESCRIBE_MAX_ITEMS:
+        lines.append(f"- and {len(rows) - DESCRIBE_MAX_ITEMS} more")
+    return lines
+
+def _describe_order(order: Dict[str, Any]) -> List[str]:
+    lines = [f"Order {order.get('order_id')} is {_value(order.get('status')).lower()}."]
+    dates = [f"{label} on {_value(order[key])}" for label, key in
+             (("placed", "created_at"), ("shipped", "shipped_at"), ("delivered", "delivered_at"),
+              ("returned", "returned_at")) if order.get(key)]
+    if dates:
+        lines.append(f"It was {', '.join(dates)}.")
+    if order.get("items"):
+        lines.append("Items:")
+        lines.extend(_bullets(order["items"], lambda item: (
+            f"{_value(item.get('product_name'))}: {_value(item.get('status'))}, {_price(item.get('sale_price'))}")))
+    return lines
+
+def _describe_stock(stock: Dict[str, Any]) -> List[str]:
+    name = _value(stock.get("product_name"))
+    if stock.get("brand"):
+        name += f" by {stock['brand']}"
+    available = stock.get("available_stock") or 0
+    if available <= 0:
+        return [f"{name} is out of stock."]
+    return [f"{name} has {available} in stock at {_price(stock.get('retail_price'))}."]
+
+def describe_context(context: Optional[Dict[str, Any]]) -> str:
+    """The looked-up data as plain sentences for the customer; empty when there is none"""
+    lines: List[str] = []
+    for key, value in (context or {}).items():
+        if key.endswith("_error"):
+            lines.append(str(value))
+        elif key == "order_info" and isinstance(value, dict):
+            lines.extend(_describe_order(value))
+        elif key == "stock_info" and isinstance(value, dict):
+            lines.extend(_describe_stock(value))
+        elif key == "top_products" and isinstance(value, list):
+            if not value:
+                lines.append("There are no sales figures yet.")
+            else:
+                lines.append("Our best sellers:")
+                lines.extend(_bullets(value, lambda product: (
+                    f"{_value(product.get('product_name'))} by {_value(product.get('brand'))}: "
+                    f"{product.get('total_orders') or 0} sold, {_price(product.get('retail_price'))}")))
+        elif key == "products" and isinstance(value, list):
+            if not value:
+                lines.append("No matching products were found.")
+            else:
+                lines.append("Matching products:")
+                lines.extend(_bullets(value, lambda product: (
+                    f"{_value(product.get('product_name'))} by {_value(product.get('brand'))} "
+                    f"({_value(product.get('category'))}), {_price(product.get('retail_price'))}")))
+    return "\n".join(lines)
@@ -0,0 +1,193 @@
+"""Write-behind, batched persistence of chat exchanges"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from conversation_store import assign_turns
+from database import engine as default_engine, Conversation
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_QUEUE_SIZE = int(os.getenv("CONVERSATION_QUEUE_SIZE", "10000"))
+CONVERSATION_BATCH_SIZE = int(os.getenv("CONVERSATION_BATCH_SIZE", "200"))
+CONVERSATION_FLUSH_INTERVAL = float(os.getenv("CONVERSATION_FLUSH_INTERVAL", "0.5"))
+
+# Attempts per batch before its rows are given up on
+MAX_ATTEMPTS = 5
+
+class ConversationLogger:
+    """Bounded queue of chat exchanges drained by one background writer task"""
+
+    def __init__(self, bind: Engine = None, max_queue: int = CONVERSATION_QUEUE_SIZE,
+                 batch_size: int = CONVERSATION_BATCH_SIZE, flush_interval: float = CONVERSATION_FLUSH_INTERVAL):
+        self.bind = bind or default_engine
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed_attempts = 0
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+        self.last_flush_ms = 0.0
+        self.last_batch_rows = 0
+        self.oldest_enqueued_at: Optional[float] = None
+        # Queued or in-flight rows per conversation, in queue order
+        self.pending: Dict[str, List[Dict[str, Any]]] = {}
+
+    def start(self):
+        """Start the writer task on the running event loop"""
+        if self.task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued, then stop the writer"""
+        if self.task is None:
+            return
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+
+    async def log(self, conversation_id: str, user_message: str, ai_response: str):
+        """Queue one exchange; waits only when the queue is full"""
+        row = {
+            "conversation_id": conversation_id,
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "created_at": datetime.utcnow(),
+        }
+        if self.task is None:
+            # Not running inside the API (scripts, tests): write straight away
+            await asyncio.to_thread(self._write, [row])
+            return
+
+        entry = (time.monotonic(), row)
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.backpressure_waits += 1
+            start = time.perf_counter()
+            await self.queue.put(entry)
+            self.backpressure_seconds += time.perf_counter() - start
+        self.pending.setdefault(conversation_id, []).append(row)
+        self.enqueued += 1
+
+    def pending_rows(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """A conversation's exchanges not yet flushed, oldest first"""
+        return list(self.pending.get(conversation_id, ()))
+
+    def _forget(self, batch: List[Dict[str, Any]]):
+        for row in batch:
+            rows = self.pending.get(row["conversation_id"])
+            if rows is None:
+                continue
+            rows[:] = [pending for pending in rows if pending is not row]
+            if not rows:
+                del self.pending[row["conversation_id"]]
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        with self.bind.begin() as connection:
+            assign_turns(connection, rows)
+            connection.execute(Conversation.__table__.insert(), rows)
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert rows one at a time so a bad row cannot sink the batch; returns rows written"""
+        written = 0
+        for row in rows:
+            # A second attempt renumbers a turn taken in the meantime (only possible off PostgreSQL)
+            for attempt in range(2):
+                try:
+                    self._write([row])
+                    written += 1
+                    break
+                except Exception as e:
+                    if attempt:
+                        logger.error("Error writing conversation %s: %s", row["conversation_id"], e)
+        return written
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except IntegrityError:
+                # Retrying will not help; isolate the offending rows
+                written = await asyncio.to_thread(self._write_rows, batch)
+                self.written += written
+                self.dropped += len(batch) - written
+                self.batches += 1
+                return
+            except Exception as e:
+                self.failed_attempts += 1
+                logger.warning("Error writing %d conversations (attempt %d): %s", len(batch), attempt, e)
+                if attempt < MAX_ATTEMPTS:
+                    await asyncio.sleep(min(0.1 * 2 ** attempt, 5.0))
+                continue
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+            self.last_batch_rows = len(batch)
+            self.written += len(batch)
+            self.batches += 1
+            return
+        self.dropped += len(batch)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            entry = await self.queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_interval
+
+            # Fill the batch until it is full or its first row has waited long enough
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    entry = self.queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self.queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self.oldest_enqueued_at = batch[0][0]
+            rows = [row for _, row in batch]
+            try:
+                await self._flush(rows)
+            finally:
+                self._forget(rows)
+            self.oldest_enqueued_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        depth = self.queue.qsize() if self.queue else 0
+        return {
+            "running": self.task is not None,
+            "queue_depth": depth,
+            "queue_capacity": self.max_queue,
+            "queue_utilization": round(depth / self.max_queue, 3) if self.max_queue else 0.0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failed_attempts": self.failed_attempts,
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_seconds": round(self.backpressure_seconds, 3),
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "last_batch_rows": self.last_batch_rows,
+            # How long the batch being written has been waiting
+            "flush_lag_seconds": round(time.monotonic() - self.oldest_enqueued_at, 3) if self.oldest_enqueued_at else 0.0,
+        }
+
+conversation_logger = ConversationLogger()
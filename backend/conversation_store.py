@@ -0,0 +1,124 @@
+"""Turn numbering and keyset-paginated reads of stored conversations"""
+import base64
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from database import Conversation
+
+MAX_PAGE_SIZE = 200
+
+# First key of the two-key pg_advisory_xact_lock taken per conversation
+# (see migrations.MIGRATION_LOCK_KEY); the second is the hashed conversation ID
+TURN_LOCK_SPACE = 4141003
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Cursor fields, or ValueError for a malformed cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+def _lock_conversations(connection: Connection, conversation_ids: List[str]):
+    """Hold each conversation's turn lock until the transaction ends"""
+    if connection.dialect.name != "postgresql":
+        return
+    # Sorted, so two batches sharing conversations cannot deadlock
+    connection.execute(
+        text("SELECT pg_advisory_xact_lock(:space, hashtext(id)) FROM unnest(CAST(:ids AS text[])) AS ids(id)"),
+        {"space": TURN_LOCK_SPACE, "ids": sorted(conversation_ids)}
+    )
+
+def assign_turns(connection: Connection, rows: List[Dict[str, Any]]):
+    """Number rows after the last stored turn of their conversation, in queue order"""
+    conversation_ids = {row["conversation_id"] for row in rows}
+    _lock_conversations(connection, conversation_ids)
+    table = Conversation.__table__
+    last_turns = dict(connection.execute(
+        select(table.c.conversation_id, func.max(table.c.turn))
+        .where(table.c.conversation_id.in_(conversation_ids))
+        .group_by(table.c.conversation_id)
+    ).all())
+    for row in rows:
+        turn = (last_turns.get(row["conversation_id"]) or 0) + 1
+        last_turns[row["conversation_id"]] = turn
+        row["turn"] = turn
+
+def _exchange(conversation: Conversation) -> Dict[str, Any]:
+    return {
+        "id": conversation.id,
+        "conversation_id": conversation.conversation_id,
+        "turn": conversation.turn,
+        "user_message": conversation.user_message,
+        "ai_response": conversation.ai_response,
+        "created_at": conversation.created_at
+    }
+
+def list_recent(db: Session, limit: int = 50, cursor: str = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Newest exchanges across all conversations, and the cursor of the next page"""
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    query = db.query(Conversation)
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            created_at = datetime.fromisoformat(position["created_at"])
+            last_id = int(position["id"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        query = query.filter(tuple_(Conversation.created_at, Conversation.id) < (created_at, last_id))
+
+    rows = query.order_by(Conversation.created_at.desc(), Conversation.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"created_at": rows[-1].created_at.isoformat(), "id": rows[-1].id})
+    return [_exchange(row) for row in rows], next_cursor
+
+def recent_turns(db: Session, conversation_id: str, count: int,
+                 pending: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """The last count exchanges of a conversation, oldest first, followed by its pending (unflushed) rows"""
+    if not conversation_id or count <= 0:
+        return []
+    rows = (
+        db.query(Conversation)
+        .filter(Conversation.conversation_id == conversation_id)
+        .order_by(Conversation.turn.desc())
+        .limit(count)
+        .all()
+    )
+    exchanges = [_exchange(row) for row in reversed(rows)]
+    # A batch stays pending until its flush returns, so it may already be stored
+    stored = {(exchange["created_at"], exchange["user_message"]) for exchange in exchanges}
+    for row in pending or []:
+        if (row["created_at"], row["user_message"]) not in stored:
+            exchanges.append({"id": None, "turn": row.get("turn"), **row})
+    return exchanges[-count:]
+
+def list_messages(db: Session, conversation_id: str, limit: int = 50,
+                  cursor: str = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """A conversation's exchanges in turn order, and the cursor of the next page"""
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    query = db.query(Conversation).filter(Conversation.conversation_id == conversation_id)
+    if cursor:
+        try:
+            after_turn = int(decode_cursor(cursor)["turn"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        query = query.filter(Conversation.turn > after_turn)
+
+    rows = query.order_by(Conversation.turn).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"turn": rows[-1].turn})
+    return [_exchange(row) for row in rows], next_cursor
@@ -0,0 +1,115 @@
+"""Connection pool settings and live statistics for the sync and async engines"""
+import os
+import threading
+import time
+from typing import Dict, Any
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Checkouts slower than this count as having waited
+WAIT_THRESHOLD_SECONDS = 0.005
+
+class PoolStats:
+    """Thread-safe checkout timing counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            if seconds >= WAIT_THRESHOLD_SECONDS:
+                self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_seconds_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+class TimedPoolMixin:
+    """Times every checkout from the underlying queue pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def engine_options(url: str, async_engine: bool = False) -> Dict[str, Any]:
+    """create_engine keyword arguments for the configured pool"""
+    if make_url(url).get_backend_name() == "sqlite" and make_url(url).database in (None, "", ":memory:"):
+        # In-memory SQLite keeps its single-connection pool
+        return {}
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if async_engine else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def async_database_url(url: str) -> str:
+    """The async driver URL for a sync DATABASE_URL (asyncpg for PostgreSQL)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+def pool_status(pool) -> Dict[str, Any]:
+    """Live counters of a pool, plus checkout timings for the timed pools"""
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
@@ -0,0 +1,253 @@
+"""Incremental delta ingest: upsert new and changed rows without a full reload
+
+Usage (from the backend directory):
+
+    python delta_ingest.py --table orders deltas/orders_0001.csv
+    python delta_ingest.py --drop-dir incoming                # apply pending files once
+    python delta_ingest.py --drop-dir incoming --watch        # keep tailing the directory
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.engine import Connection, Engine
+
+import rollups
+import stock_summary
+from database import engine as default_engine, create_tables, IngestWatermark
+from load_orchestrator import dependency_graph
+from table_schemas import (
+    TABLE_MODELS, TABLE_SCHEMAS, RejectWriter, apply_schema, frame_records, read_csv_kwargs, required
+)
+
+logger = logging.getLogger(__name__)
+
+# Conflict target per table: primary keys, or the business key where the database assigns the primary
+# key (orders.id and order_items.id are serials that the exports do not carry)
+UPSERT_KEYS = {
+    "distribution_centers": ["id"],
+    "products": ["id"],
+    "users": ["id"],
+    "orders": ["order_id"],
+    "order_items": ["inventory_item_id"],
+    "inventory_items": ["id"],
+}
+
+# Columns whose latest value marks how fresh a table's data is
+CHANGE_COLUMNS = {
+    "users": ["created_at"],
+    "orders": ["created_at", "shipped_at", "delivered_at", "returned_at"],
+    "order_items": ["created_at", "shipped_at", "delivered_at", "returned_at"],
+    "inventory_items": ["created_at", "sold_at"],
+}
+
+# Called with (connection, table_name, upserted frame) for every chunk inside the batch transaction
+batch_hooks: List[Callable[[Connection, str, pd.DataFrame], None]] = [
+    rollups.on_delta_batch,
+    stock_summary.on_delta_batch,
+]
+
+def delta_schema(table_name: str):
+    """Full-load schema with the upsert key required"""
+    schema = dict(TABLE_SCHEMAS[table_name])
+    for key in UPSERT_KEYS[table_name]:
+        schema[key] = required("int")
+    return schema
+
+def upsert_statement(bind: Engine, table_name: str):
+    """INSERT ... ON CONFLICT DO UPDATE for the table, in the engine's dialect"""
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Upserts are not supported on {bind.dialect.name}")
+
+    table = TABLE_MODELS[table_name].__table__
+    keys = UPSERT_KEYS[table_name]
+    statement = insert(table)
+    updates = {
+        name: statement.excluded[name]
+        for name in delta_schema(table_name) if name not in keys
+    }
+    # ON CONFLICT DO UPDATE skips column onupdate defaults
+    if "updated_at" in table.c:
+        updates["updated_at"] = func.now()
+    return statement.on_conflict_do_update(index_elements=keys, set_=updates)
+
+def latest_change(frame: pd.DataFrame, table_name: str) -> Optional[datetime]:
+    columns = [c for c in CHANGE_COLUMNS.get(table_name, []) if c in frame.columns]
+    if not columns or frame.empty:
+        return None
+    latest = frame[columns].max().max()
+    return None if pd.isna(latest) else latest.to_pydatetime()
+
+def advance_watermark(connection: Connection, table_name: str, file_name: str,
+                      watermark: Optional[datetime], rows: int):
+    """Record the batch in ingest_watermarks within the batch transaction"""
+    table = IngestWatermark.__table__
+    existing = connection.execute(
+        table.select().where(table.c.table_name == table_name)
+    ).first()
+
+    values = {
+        "last_file": file_name,
+        "watermark": max(filter(None, [watermark, existing.watermark if existing else None]), default=None),
+        "rows_ingested": (existing.rows_ingested or 0) + rows if existing else rows,
+        "updated_at": datetime.utcnow()
+    }
+    if existing:
+        connection.execute(table.update().where(table.c.table_name == table_name).values(**values))
+    else:
+        connection.execute(table.insert().values(table_name=table_name, **values))
+
+def ingest_file(table_name: str, csv_path: str, bind: Engine = None, chunk_size: int = 50000,
+                reject_writer: RejectWriter = None) -> Dict[str, Any]:
+    """Apply one delta file as a single transaction and return batch stats"""
+    bind = bind or default_engine
+    reject_writer = reject_writer or RejectWriter()
+    schema = delta_schema(table_name)
+    statement = upsert_statement(bind, table_name)
+
+    start = time.perf_counter()
+    rows = 0
+    rejected = 0
+    watermark = None
+
+    with bind.begin() as connection:
+        if table_name == "inventory_items":
+            stock_summary.wait_for_triggers(connection)
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size, **read_csv_kwargs(table_name, schema)):
+            frame, rejects = apply_schema(table_name, chunk, schema)
+            reject_writer.write(table_name, rejects)
+            rejected += len(rejects)
+            if frame.empty:
+                continue
+
+            # A key repeated within a batch must resolve to its last version
+            frame = frame.drop_duplicates(subset=UPSERT_KEYS[table_name], keep="last")
+            connection.execute(statement, frame_records(frame))
+            for hook in batch_hooks:
+                hook(connection, table_name, frame)
+            rows += len(frame)
+            watermark = max(filter(None, [watermark, latest_change(frame, table_name)]), default=None)
+
+        if rejected and not rows:
+            # Rolls the batch back, so the file stays pending instead of being recorded as applied
+            raise ValueError(f"none of the {rejected} rows in {csv_path} were valid")
+        advance_watermark(connection, table_name, os.path.basename(csv_path), watermark, rows)
+
+    elapsed = time.perf_counter() - start
+    logger.info("Upserted %d %s rows from %s in %.3fs (%d rejected)", rows, table_name, csv_path, elapsed, rejected)
+    return {"table": table_name, "file": csv_path, "rows": rows, "rejected": rejected,
+            "seconds": round(elapsed, 3), "watermark": watermark}
+
+def table_for_file(file_name: str) -> Optional[str]:
+    """Match a delta file to its table by name prefix (longest table name wins)"""
+    if not file_name.endswith(".csv"):
+        return None
+    for table_name in sorted(UPSERT_KEYS, key=len, reverse=True):
+        if file_name.startswith(table_name):
+            return table_name
+    return None
+
+def pending_files(drop_dir: str, bind: Engine) -> Dict[str, List[str]]:
+    """Delta files per table that sort after the table's last applied file"""
+    table = IngestWatermark.__table__
+    with bind.connect() as connection:
+        last_files = {row.table_name: row.last_file for row in connection.execute(table.select())}
+
+    pending: Dict[str, List[str]] = {}
+    for file_name in sorted(os.listdir(drop_dir)):
+        table_name = table_for_file(file_name)
+        if not table_name:
+            continue
+        last_file = last_files.get(table_name)
+        if last_file and file_name <= last_file:
+            continue
+        pending.setdefault(table_name, []).append(os.path.join(drop_dir, file_name))
+    return pending
+
+def ingest_drop_dir(drop_dir: str, bind: Engine = None, reject_writer: RejectWriter = None) -> List[Dict[str, Any]]:
+    """Apply every pending file once, parents before children; a failed table holds back its dependents"""
+    bind = bind or default_engine
+    pending = pending_files(drop_dir, bind)
+    graph = dependency_graph(list(UPSERT_KEYS))
+    results = []
+    visited = set()
+    blocked = set()
+
+    while len(visited) < len(graph):
+        ready = [t for t in graph if t not in visited and graph[t] <= visited]
+        for table_name in ready:
+            visited.add(table_name)
+            if graph[table_name] & blocked:
+                blocked.add(table_name)
+                if pending.get(table_name):
+                    logger.warning("Skipping %d %s files until %s apply cleanly", len(pending[table_name]),
+                                   table_name, ", ".join(sorted(graph[table_name] & blocked)))
+                continue
+            for csv_path in pending.get(table_name, []):
+                try:
+                    results.append(ingest_file(table_name, csv_path, bind, reject_writer=reject_writer))
+                except Exception as e:
+                    logger.error("Error ingesting %s: %s", csv_path, e)
+                    blocked.add(table_name)
+                    break
+    return results
+
+def table_lag(bind: Engine = None) -> List[Dict[str, Any]]:
+    """High-water marks and how far behind wall-clock time each table is"""
+    bind = bind or default_engine
+    table = IngestWatermark.__table__
+    now = datetime.utcnow()
+    with bind.connect() as connection:
+        rows = connection.execute(table.select().order_by(table.c.table_name)).all()
+    return [
+        {
+            "table": row.table_name,
+            "last_file": row.last_file,
+            "watermark": row.watermark,
+            "rows_ingested": row.rows_ingested,
+            "updated_at": row.updated_at,
+            "lag_seconds": round((now - row.watermark).total_seconds(), 1) if row.watermark else None
+        }
+        for row in rows
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Upsert delta CSVs into the database")
+    parser.add_argument("files", nargs="*", help="delta CSV files to apply (requires --table)")
+    parser.add_argument("--table", choices=sorted(UPSERT_KEYS), help="table the given files belong to")
+    parser.add_argument("--drop-dir", help="directory of append-only delta files named <table>*.csv")
+    parser.add_argument("--watch", action="store_true", help="keep polling --drop-dir for new files")
+    parser.add_argument("--interval", type=float, default=2.0, help="polling interval in seconds")
+    parser.add_argument("--reject-dir", default="rejects", help="where rows failing type checks are written")
+    args = parser.parse_args()
+
+    if not args.drop_dir and not (args.files and args.table):
+        parser.error("pass --drop-dir, or delta files together with --table")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    create_tables()
+    reject_writer = RejectWriter(args.reject_dir)
+
+    for csv_path in args.files:
+        ingest_file(args.table, csv_path, reject_writer=reject_writer)
+
+    if args.drop_dir:
+        while True:
+            ingest_drop_dir(args.drop_dir, reject_writer=reject_writer)
+            if not args.watch:
+                break
+            time.sleep(args.interval)
+
+    reject_writer.summary()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""Aho-Corasick recognizer for catalog product names, SKUs, brands and categories in a message"""
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import Product
+from product_search import catalog_signature, tokenize
+
+logger = logging.getLogger(__name__)
+
+ENTITY_REFRESH_INTERVAL = float(os.getenv("ENTITY_REFRESH_INTERVAL", "300"))
+
+# Entity kinds, most specific first; a product name or SKU identifies one product
+ENTITY_KINDS = ["sku", "name", "brand", "category"]
+
+# Edge keys pack (node, token id) into one int
+TOKEN_BITS = 24
+
+# Product IDs listed per match; brands and categories can cover thousands
+MAX_MATCH_PRODUCTS = 50
+
+class EntityRecognizer:
+    """Word-level Aho-Corasick automaton over catalog entities"""
+
+    def __init__(self):
+        self.token_ids: Dict[str, int] = {}
+        self.edges: Dict[int, int] = {}           # (node << TOKEN_BITS) | token id -> child node
+        self.depth = array("i", [0])              # tokens from the root to each node
+        self.parent = array("i", [0])
+        self.token = array("i", [0])              # token id of the edge into each node
+        self.fail = array("i", [0])
+        self.terminal: Dict[int, List[int]] = {}  # node -> entity ids whose pattern ends exactly there
+        self.token_nodes: Dict[int, array] = {}   # token id -> nodes entered on it, in creation order
+        self.entity_ids: Dict[Tuple[str, Tuple[int, ...]], int] = {}
+        self.entities: List[Tuple[str, str]] = []            # entity id -> (kind, text)
+        self.entity_lengths = array("i")                     # entity id -> pattern length in tokens
+        self.entity_products: List[array] = []               # entity id -> product ids
+        self.max_product_id = 0
+        self.product_count = 0
+        self.updated_at = None  # latest products.updated_at the automaton reflects
+        self.build_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def _token_id(self, token: str) -> int:
+        token_id = self.token_ids.get(token)
+        if token_id is None:
+            token_id = self.token_ids[token] = len(self.token_ids)
+        return token_id
+
+    def _insert(self, kind: str, text: str, product_id: int):
+        tokens = tokenize(text)
+        if not tokens:
+            return
+        pattern = tuple(self._token_id(token) for token in tokens)
+        entity_id = self.entity_ids.get((kind, pattern))
+        if entity_id is None:
+            entity_id = self.entity_ids[(kind, pattern)] = len(self.entities)
+            self.entities.append((kind, text))
+            self.entity_lengths.append(len(pattern))
+            self.entity_products.append(array("i"))
+
+            node = 0
+            for token_id in pattern:
+                key = (node << TOKEN_BITS) | token_id
+                child = self.edges.get(key)
+                if child is None:
+                    child = self.edges[key] = len(self.depth)
+                    self.depth.append(self.depth[node] + 1)
+                    self.parent.append(node)
+                    self.token.append(token_id)
+                    self.fail.append(0)
+                    self.token_nodes.setdefault(token_id, array("i")).append(child)
+                node = child
+            self.terminal.setdefault(node, []).append(entity_id)
+        self.entity_products[entity_id].append(product_id)
+
+    def _fail_target(self, node: int) -> int:
+        """Longest proper suffix of node's pattern that is also in the trie"""
+        parent, token_id = self.parent[node], self.token[node]
+        if parent == 0:
+            return 0
+        state = self.fail[parent]
+        while state and ((state << TOKEN_BITS) | token_id) not in self.edges:
+            state = self.fail[state]
+        target = self.edges.get((state << TOKEN_BITS) | token_id, 0)
+        return target if target != node else 0
+
+    def _ends_with(self, node: int, suffix: int) -> bool:
+        """True when suffix's token path is a suffix of node's"""
+        for _ in range(self.depth[suffix]):
+            if self.token[node] != self.token[suffix]:
+                return False
+            node, suffix = self.parent[node], self.parent[suffix]
+        return True
+
+    def _link(self, first_new: int = 1):
+        """Set failure links for nodes from first_new on, and the older nodes they affect"""
+        # An older node's link only changes when a new node spells a longer suffix of its pattern;
+        # when finding those would cost more than relinking everything, everything is relinked
+        new_nodes = range(first_new, len(self.depth))
+        checks = sum(len(self.token_nodes[self.token[node]]) for node in new_nodes)
+        if first_new <= 1 or checks > len(self.depth):
+            nodes = range(1, len(self.depth))
+        else:
+            affected = set(new_nodes)
+            for suffix in new_nodes:
+                depth = self.depth[suffix]
+                for node in self.token_nodes[self.token[suffix]]:
+                    if node >= first_new:
+                        break
+                    if self.depth[node] > depth > self.depth[self.fail[node]] and self._ends_with(node, suffix):
+                        affected.add(node)
+            nodes = affected
+        # Shallower nodes first, so each parent's link is final before its children use it
+        for node in sorted(nodes, key=self.depth.__getitem__):
+            self.fail[node] = self._fail_target(node)
+
+    def add_products(self, rows: Iterable[Tuple[int, str, str, str, str]]):
+        """Insert (id, name, brand, category, sku) rows and link the new part of the automaton"""
+        start = time.perf_counter()
+        with self.lock:
+            first_new = len(self.depth)
+            for product_id, name, brand, category, sku in rows:
+                for kind, text in (("name", name), ("sku", sku), ("brand", brand), ("category", category)):
+                    if text:
+                        self._insert(kind, text, product_id)
+                self.max_product_id = max(self.max_product_id, product_id)
+                self.product_count += 1
+            self._link(first_new)
+        self.build_seconds = time.perf_counter() - start
+
+    def find(self, message: str) -> List[Dict[str, Any]]:
+        """Every catalog entity in the message, longest first, without overlaps"""
+        tokens = tokenize(message)
+        matches = []
+        with self.lock:
+            node = 0
+            for position, token in enumerate(tokens):
+                token_id = self.token_ids.get(token)
+                if token_id is None:
+                    node = 0
+                    continue
+                while node and ((node << TOKEN_BITS) | token_id) not in self.edges:
+                    node = self.fail[node]
+                node = self.edges.get((node << TOKEN_BITS) | token_id, 0)
+                # Patterns ending here: this node's own, then those of its failure chain
+                state = node
+                while state:
+                    for entity_id in self.terminal.get(state, ()):
+                        matches.append((position + 1 - self.entity_lengths[entity_id], position + 1, entity_id))
+                    state = self.fail[state]
+
+            # Longest first, then most specific kind, then leftmost, without overlapping spans
+            matches.sort(key=lambda m: (-(m[1] - m[0]), ENTITY_KINDS.index(self.entities[m[2]][0]), m[0]))
+            taken = set()
+            results = []
+            for start, end, entity_id in matches:
+                span = set(range(start, end))
+                if span & taken:
+                    continue
+                taken |= span
+                kind, text = self.entities[entity_id]
+                products = self.entity_products[entity_id]
+                results.append({
+                    "kind": kind,
+                    "text": text,
+                    "start": start,
+                    "end": end,
+                    # Products are added in ID order, so these are the lowest IDs
+                    "product_ids": products[:MAX_MATCH_PRODUCTS].tolist(),
+                    "product_count": len(products),
+                })
+        return sorted(results, key=lambda r: r["start"])
+
+    def resolve_product(self, message: str) -> Optional[int]:
+        """ID of the product named (or SKU'd) in the message, preferring the longest match"""
+        candidates = [m for m in self.find(message) if m["kind"] in ("sku", "name")]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda m: (m["end"] - m["start"], m["kind"] == "sku"))
+        return best["product_ids"][0]
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Entity, node and byte counts for the automaton's structures"""
+        int_size = sys.getsizeof(2 ** 40)
+        with self.lock:
+            edge_bytes = sys.getsizeof(self.edges) + len(self.edges) * 2 * int_size
+            output_bytes = sys.getsizeof(self.terminal) + sum(sys.getsizeof(ids) for ids in self.terminal.values())
+            node_bytes = sum(
+                a.buffer_info()[1] * a.itemsize
+                for a in (self.depth, self.parent, self.token, self.fail, self.entity_lengths, *self.token_nodes.values())
+            ) + sys.getsizeof(self.token_nodes)
+            entity_bytes = sys.getsizeof(self.entities) + sum(
+                sys.getsizeof(text) for _, text in self.entities
+            ) + sys.getsizeof(self.entity_ids) + sum(
+                products.buffer_info()[1] * products.itemsize + 64 for products in self.entity_products
+            )
+            vocabulary_bytes = sys.getsizeof(self.token_ids) + sum(sys.getsizeof(t) for t in self.token_ids)
+            report = {
+                "products": self.product_count,
+                "entities": len(self.entities),
+                "entities_by_kind": {kind: 0 for kind in ENTITY_KINDS},
+                "nodes": len(self.depth),
+                "edges": len(self.edges),
+                "vocabulary": len(self.token_ids),
+                "bytes": {
+                    "edges": edge_bytes,
+                    "nodes": node_bytes,
+                    "outputs": output_bytes,
+                    "entities": entity_bytes,
+                    "vocabulary": vocabulary_bytes,
+                },
+                "build_seconds": round(self.build_seconds, 3),
+            }
+            for kind, _ in self.entities:
+                report["entities_by_kind"][kind] += 1
+        report["bytes"]["total"] = sum(report["bytes"].values())
+        return report
+
+def _product_rows(db: Session, after_id: int = 0):
+    return db.query(Product.id, Product.name, Product.brand, Product.category, Product.sku)\
+             .filter(Product.id > after_id)\
+             .order_by(Product.id)\
+             .yield_per(10000)
+
+def _edited_since(db: Session, recognizer: EntityRecognizer) -> bool:
+    """True when a product the recognizer already holds changed after it was last refreshed"""
+    edited = Product.updated_at.isnot(None) if recognizer.updated_at is None else Product.updated_at > recognizer.updated_at
+    return db.query(Product.id).filter(Product.id <= recognizer.max_product_id, edited).first() is not None
+
+class RecognizerHolder:
+    """Shares one recognizer per process and keeps it in step with the products table"""
+
+    def __init__(self, refresh_interval: float = ENTITY_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.recognizer: Optional[EntityRecognizer] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        self.schedule_lock = threading.Lock()
+        self.refreshing = False
+
+    def refresh(self, db: Session) -> Dict[str, Any]:
+        """Add products created since the last refresh, or rebuild when products were removed or edited"""
+        with self.lock:
+            count, max_id, updated_at = catalog_signature(db)
+            max_id = max_id or 0
+            recognizer = self.recognizer
+            if recognizer is None or count < recognizer.product_count or max_id < recognizer.max_product_id \
+                    or _edited_since(db, recognizer):
+                recognizer = EntityRecognizer()
+                recognizer.add_products(_product_rows(db))
+                self.recognizer = recognizer
+                mode = "rebuild"
+            elif max_id > recognizer.max_product_id:
+                # Fetched before add_products takes the lock that find() waits on
+                recognizer.add_products(list(_product_rows(db, recognizer.max_product_id)))
+                mode = "incremental"
+            else:
+                mode = "unchanged"
+            recognizer.updated_at = updated_at
+            self.checked_at = time.monotonic()
+        return {"mode": mode, "products": recognizer.product_count, "seconds": round(recognizer.build_seconds, 3)}
+
+    def _refresh_in_background(self, session_factory):
+        db = session_factory()
+        try:
+            self.refresh(db)
+        except Exception as e:
+            logger.error("Error refreshing entity recognizer: %s", e)
+        finally:
+            db.close()
+            self.refreshing = False
+
+    def get(self, db: Session) -> EntityRecognizer:
+        """Current recognizer; built on first use, then refreshed in the background when the interval has passed"""
+        from database import SessionLocal
+
+        if self.recognizer is None:
+            self.refresh(db)
+            return self.recognizer
+
+        now = time.monotonic()
+        if now - self.checked_at >= self.refresh_interval and not self.refreshing:
+            with self.schedule_lock:
+                if now - self.checked_at >= self.refresh_interval and not self.refreshing:
+                    self.checked_at = now
+                    self.refreshing = True
+                    threading.Thread(target=self._refresh_in_background, args=(SessionLocal,), daemon=True).start()
+        return self.recognizer
+
+    def warm(self):
+        """Build the recognizer ahead of the first message"""
+        from database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.get(db)
+        finally:
+            db.close()
+
+recognizer = RecognizerHolder()
+
+if __name__ == "__main__":
+    import json
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(recognizer.refresh(db))
+        print(json.dumps(recognizer.recognizer.memory_report(), indent=2))
+        for message in sys.argv[1:]:
+            print(message, "->", recognizer.recognizer.find(message))
+    finally:
+        db.close()
@@ -0,0 +1,152 @@
+import json
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+# Supported intents, in tie-break priority order
+INTENTS = ["order_status", "stock_check", "product_query", "general_help"]
+
+# Score a further intent needs to be reported alongside the best one (about two solid cues),
+# so "is order 12345 shipped and is the hoodie in stock" yields both order_status and stock_check
+SECONDARY_INTENT_MIN_SCORE = 2.0
+
+# Common clothing terms used as product entities
+CLOTHING_TERMS = [
+    't-shirt', 'tshirt', 'shirt', 'pants', 'jeans', 'dress', 'skirt',
+    'jacket', 'hoodie', 'sweater', 'sweatshirt', 'shorts', 'blouse',
+    'cap', 'hat', 'accessories', 'shoes', 'sneakers', 'boots'
+]
+
+# Weighted keyword/pattern tables per intent
+INTENT_PATTERNS: Dict[str, List[Tuple[str, float]]] = {
+    "order_status": [
+        (r"\border(s|ed)?\b", 1.5),
+        (r"\bstatus\b", 1.0),
+        (r"\btrack(ing)?\b", 2.0),
+        (r"\b(ship(ped|ping|ment)?|deliver(ed|y)?|arriv(e|ed|al))\b", 1.0),
+        (r"\b(where is|when will)\b", 0.5),
+        (r"#?\b\d{5,}\b", 1.5),
+    ],
+    "stock_check": [
+        (r"\b(in|out of) stock\b", 2.5),
+        (r"\bstock\b", 1.5),
+        (r"\bavailab(le|ility)\b", 1.5),
+        (r"\bquantity\b", 1.0),
+        (r"\bhow many\b", 1.0),
+        (r"\b(left|remaining|inventory)\b", 1.0),
+    ],
+    "product_query": [
+        (r"\bproducts?\b", 1.5),
+        (r"\bitems?\b", 0.5),
+        (r"\bclothing\b", 1.0),
+        (r"\b(top|best[- ]?sell(ing|ers?)|most (sold|popular))\b", 1.5),
+        (r"\bsold\b", 0.5),
+        (r"\b(price|cost|brand|categor(y|ies)|recommend)\b", 1.0),
+        (r"\b(" + "|".join(re.escape(term) for term in CLOTHING_TERMS) + r")s?\b", 1.0),
+    ],
+    "general_help": [
+        (r"\b(hi|hello|hey|thanks|thank you)\b", 1.5),
+        (r"\b(help|support|contact|agent)\b", 1.0),
+        (r"\b(return|refund|exchange|policy|cancel)\b", 1.5),
+    ],
+}
+
+# Entity patterns (same order ID rules as BusinessLogicService.extract_order_id)
+ORDER_ID_PATTERNS = [
+    re.compile(r'order\s+(?:id\s+)?(\d+)'),
+    re.compile(r'order\s+#(\d+)'),
+    re.compile(r'(\d{5,})'),
+]
+PRODUCT_TERM_PATTERN = re.compile(r"\b(" + "|".join(re.escape(term) for term in CLOTHING_TERMS) + r")")
+TOP_N_PATTERN = re.compile(r"\btop\s+(\d{1,2})\b")
+
+class IntentClassifier:
+    """In-process intent and entity extraction using compiled pattern tables"""
+
+    def __init__(self, patterns: Dict[str, List[Tuple[str, float]]] = None, prior: float = 1.0,
+                 secondary_min_score: float = SECONDARY_INTENT_MIN_SCORE):
+        self.patterns = {
+            intent: [(re.compile(pattern), weight) for pattern, weight in rules]
+            for intent, rules in (patterns or INTENT_PATTERNS).items()
+        }
+        # Smoothing term: a lone weak match should not produce a confident answer
+        self.prior = prior
+        self.secondary_min_score = secondary_min_score
+
+    def score(self, message: str) -> Dict[str, float]:
+        """Return the summed pattern weight for every intent"""
+        message_lower = message.lower()
+        return {
+            intent: sum(weight for pattern, weight in rules if pattern.search(message_lower))
+            for intent, rules in self.patterns.items()
+        }
+
+    def extract_entities(self, message: str) -> Dict[str, Any]:
+        """Extract order IDs, product terms and top-N limits from a message"""
+        message_lower = message.lower()
+        entities = {}
+
+        for pattern in ORDER_ID_PATTERNS:
+            match = pattern.search(message_lower)
+            if match:
+                entities["order_id"] = match.group(1)
+                break
+
+        match = PRODUCT_TERM_PATTERN.search(message_lower)
+        if match:
+            entities["product_name"] = match.group(1)
+
+        match = TOP_N_PATTERN.search(message_lower)
+        if match:
+            entities["top_n"] = int(match.group(1))
+
+        return entities
+
+    def classify(self, message: str) -> Dict[str, Any]:
+        """Classify a message into an intent with a confidence in [0, 1], plus any strong secondary intents"""
+        scores = self.score(message)
+        ranked = sorted(INTENTS, key=lambda intent: (-scores.get(intent, 0.0), INTENTS.index(intent)))
+        best, runner_up = ranked[0], ranked[1]
+        best_score = scores.get(best, 0.0)
+
+        if best_score == 0:
+            intent, confidence = "general_help", 0.0
+        else:
+            intent = best
+            confidence = best_score / (best_score + scores.get(runner_up, 0.0) + self.prior)
+        intents = [intent] + [
+            other for other in ranked if other != intent and scores.get(other, 0.0) >= self.secondary_min_score
+        ]
+
+        entities = self.extract_entities(message)
+        requires_clarification = (
+            (intent == "order_status" and "order_id" not in entities) or
+            (intent == "stock_check" and "product_name" not in entities)
+        )
+
+        return {
+            "intent": intent,
+            "intents": intents,
+            "entities": entities,
+            "requires_clarification": requires_clarification,
+            "confidence": round(confidence, 3),
+            "scores": scores,
+            "source": "local"
+        }
+
+def parse_llm_intent(response: str) -> Optional[Dict[str, Any]]:
+    """Parse the JSON object returned by the LLM intent prompt, if valid"""
+    match = re.search(r"\{.*\}", response or "", re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("intent") not in INTENTS:
+        return None
+    entities = data.get("entities")
+    return {
+        "intent": data["intent"],
+        "entities": entities if isinstance(entities, dict) else {},
+        "requires_clarification": bool(data.get("requires_clarification", False))
+    }
@@ -0,0 +1,321 @@
+"""Groq client with pooled connections, deadlines, retries, a concurrency cap and a circuit breaker"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import groq
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "10"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "3"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.25"))
+LLM_RETRY_MAX_BACKOFF = float(os.getenv("LLM_RETRY_MAX_BACKOFF", "2"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "64"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+class LLMUnavailableError(Exception):
+    """The completion was not attempted or did not finish; reason says why"""
+
+    reason = "error"
+
+class CircuitOpenError(LLMUnavailableError):
+    reason = "circuit_open"
+
+class LLMOverloadedError(LLMUnavailableError):
+    reason = "overloaded"
+
+class LLMDeadlineError(LLMUnavailableError):
+    reason = "deadline"
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient failures worth another attempt"""
+    if isinstance(error, (groq.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header, if the response had one"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def admit(self) -> Optional[str]:
+        """State a call is let through in, or None when rejected; half-open admits one probe at a time"""
+        if self.failure_threshold <= 0:
+            return self.CLOSED
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return state
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return state
+            self.rejected += 1
+            return None
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probing = False
+            self._state = self.CLOSED
+
+    def record_failure(self, error: BaseException = None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if error is not None:
+                self.last_error = f"{type(error).__name__}: {error}"
+            if self._state == self.HALF_OPEN or (
+                    self.failure_threshold > 0 and self.consecutive_failures >= self.failure_threshold):
+                if self._state != self.OPEN:
+                    self.opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a half-open probe that ended without an outcome (cancelled)"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_in = max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0) if state == self.OPEN else 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "retry_in_seconds": round(retry_in, 3),
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+class LLMClient:
+    """Groq chat completions behind pooling, deadlines, retries, a concurrency cap and a circuit breaker"""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        limits = httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE,
+                              keepalive_expiry=LLM_KEEPALIVE_SECONDS)
+        timeout = httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        # max_retries=0: retries follow the policy below, not the client's own
+        self.async_client = groq.AsyncGroq(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+                                           http_client=httpx.AsyncClient(limits=limits, timeout=timeout))
+        self.breaker = CircuitBreaker()
+        self.max_concurrency = LLM_MAX_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.counts = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "overloaded": 0, "deadline_exceeded": 0}
+
+    def _count(self, field: str, amount: int = 1):
+        with self._lock:
+            self.counts[field] += amount
+
+    def _track(self, field: str, amount: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def _admit(self) -> bool:
+        """Fail fast while the breaker is open; True when this call is the half-open probe"""
+        self._count("calls")
+        state = self.breaker.admit()
+        if state is None:
+            raise CircuitOpenError(f"LLM circuit open: {self.breaker.last_error}")
+        return state == CircuitBreaker.HALF_OPEN
+
+    def _abandon(self, probe: bool):
+        """A call that ended without an outcome hands back the probe it held"""
+        if probe:
+            self.breaker.release()
+
+    def _backoff(self, attempt: int, error: BaseException, remaining: float) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None when no retry fits"""
+        if attempt >= LLM_MAX_RETRIES or not is_retryable(error):
+            return None
+        delay = _retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(LLM_RETRY_MAX_BACKOFF, LLM_RETRY_BACKOFF * 2 ** attempt))
+        # Leave room for the next attempt to do something
+        return delay if delay < remaining - 0.1 else None
+
+    def _finish(self, error: Optional[BaseException], probe: bool):
+        """Feed a call's outcome to the breaker; only provider trouble counts against it"""
+        if error is None:
+            self.breaker.record_success()
+        elif is_retryable(error) or isinstance(error, LLMDeadlineError):
+            self._count("failures")
+            self.breaker.record_failure(error)
+        else:
+            # Bad request or auth: says nothing about the provider's health
+            self._abandon(probe)
+
+    async def _acquire(self, deadline: float):
+        wait = min(LLM_QUEUE_TIMEOUT, deadline - time.monotonic())
+        self._track("waiting", 1)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(wait, 0.0))
+        except asyncio.TimeoutError:
+            self._count("overloaded")
+            raise LLMOverloadedError(f"No LLM slot free within {wait:.1f}s ({self.max_concurrency} in flight)")
+        finally:
+            self._track("waiting", -1)
+
+    async def _aattempts(self, create: Callable[..., Any], deadline: float, **kwargs) -> Any:
+        """Run create() until it succeeds, fails for good or the deadline passes"""
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count("deadline_exceeded")
+                raise LLMDeadlineError(f"LLM deadline of {LLM_DEADLINE:.0f}s exceeded")
+            self._count("attempts")
+            try:
+                return await asyncio.wait_for(create(timeout=min(LLM_TIMEOUT, remaining), **kwargs), remaining)
+            except asyncio.TimeoutError as e:
+                # Only the overall deadline raises this; per-attempt timeouts are APITimeoutError
+                self._count("deadline_exceeded")
+                raise LLMDeadlineError(f"LLM deadline of {LLM_DEADLINE:.0f}s exceeded") from e
+            except Exception as e:
+                delay = self._backoff(attempt, e, deadline - time.monotonic())
+                if delay is None:
+                    raise
+                logger.warning("Error calling Groq API (attempt %d, retrying in %.2fs): %s", attempt + 1, delay, e)
+            attempt += 1
+            self._count("retries")
+            await asyncio.sleep(delay)
+
+    async def acreate(self, **kwargs) -> Any:
+        """Async chat completion under the full policy; kwargs go to chat.completions.create"""
+        probe = self._admit()
+        deadline = time.monotonic() + LLM_DEADLINE
+        error = None
+        try:
+            await self._acquire(deadline)
+        except BaseException:
+            self._abandon(probe)
+            raise
+        self._track("in_flight", 1)
+        try:
+            return await self._aattempts(self.async_client.chat.completions.create, deadline, **kwargs)
+        except asyncio.CancelledError:
+            self._abandon(probe)
+            error = False
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._track("in_flight", -1)
+            self._semaphore.release()
+            if error is not False:
+                self._finish(error, probe)
+
+    async def astream(self, **kwargs) -> AsyncIterator[Any]:
+        """Streamed chat completion chunks within the deadline; only opening the stream is retried"""
+        probe = self._admit()
+        deadline = time.monotonic() + LLM_DEADLINE
+        error = None
+        try:
+            await self._acquire(deadline)
+        except BaseException:
+            self._abandon(probe)
+            raise
+        self._track("in_flight", 1)
+        stream = None
+        try:
+            stream = await self._aattempts(self.async_client.chat.completions.create, deadline, stream=True, **kwargs)
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - time.monotonic(), 0.0))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError as e:
+                    self._count("deadline_exceeded")
+                    raise LLMDeadlineError(f"LLM deadline of {LLM_DEADLINE:.0f}s exceeded") from e
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            self._abandon(probe)
+            error = False
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if stream is not None:
+                # Hands the connection back to the pool even when the caller stops early
+                await stream.close()
+            self._track("in_flight", -1)
+            self._semaphore.release()
+            if error is not False:
+                self._finish(error, probe)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+            in_flight, waiting = self.in_flight, self.waiting
+        return {
+            "circuit": self.breaker.stats(),
+            "in_flight": in_flight,
+            "waiting": waiting,
+            "max_concurrency": self.max_concurrency,
+            **counts,
+            "config": {
+                "timeout": LLM_TIMEOUT,
+                "deadline": LLM_DEADLINE,
+                "max_retries": LLM_MAX_RETRIES,
+                "queue_timeout": LLM_QUEUE_TIMEOUT,
+                "pool_size": LLM_POOL_SIZE,
+            },
+        }
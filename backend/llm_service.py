@@ -1,55 +1,217 @@
+import hashlib
+import json
+import logging
 import os
-import groq
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, AsyncIterator, Tuple
 from dotenv import load_dotenv
 
+from context_encoder import CONTEXT_TOKEN_BUDGET, MESSAGE_OVERHEAD_TOKENS, describe_context, encode_context, estimate_tokens
+from intent_classifier import IntentClassifier, parse_llm_intent
+from llm_client import LLMClient
+from response_cache import create_response_cache
+import metrics
+import single_flight
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
+FALLBACK_RESPONSE = "I apologize, but I'm having trouble processing your request right now. Please try again later."
+
+# Lead-in for answers built from the looked-up data alone when the LLM is unavailable
+DEGRADED_PREFIX = "I can't give a full answer right now, but here is what I found for your request:"
+
+SYSTEM_PROMPT = (
+    "You are a helpful customer support chatbot for an e-commerce clothing website. "
+    "You help with product information and availability, order status and tracking, stock levels "
+    "and general customer service questions. Be polite and answer only from the context provided; "
+    "lists are a column header followed by one row per item. "
+    "If you don't have enough information to answer, ask for clarification."
+)
+
 class LLMService:
     def __init__(self):
-        self.client = groq.Groq(api_key=os.getenv("GROQ_API_KEY"))
+        # Pooled Groq clients with deadlines, retries, a concurrency cap and a circuit breaker;
+        # the async client is used by the chat endpoint so Groq calls don't block the event loop
+        self.llm = LLMClient(api_key=os.getenv("GROQ_API_KEY"))
         self.model = "llama3-8b-8192"  # Using Llama3 model
-    
-    def generate_response(self, user_message: str, context: Dict[str, Any] = None) -> str:
-        """Generate AI response using Groq API"""
         
-        # Build the system prompt
-        system_prompt = """You are a helpful customer support chatbot for an e-commerce clothing website. 
-        You can help customers with:
-        - Product information and availability
-        - Order status and tracking
-        - Stock levels
-        - General customer service questions
+        # Response cache keyed on the normalized message and context (None when disabled)
+        self.response_cache = create_response_cache(namespace=f"{self.model}:")
+        
+        # Local intent classification with optional LLM fallback for low-confidence messages
+        self.intent_classifier = IntentClassifier()
+        self.intent_llm_fallback = os.getenv("INTENT_LLM_FALLBACK", "true").lower() == "true"
+        self.intent_confidence_threshold = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.5"))
         
-        Always be polite, helpful, and provide accurate information based on the available data.
-        If you don't have enough information to answer a question, ask for clarification."""
+        # Prompt size per request; counted only for requests that reached the API
+        self.context_token_budget = CONTEXT_TOKEN_BUDGET
+        self.prompt_stats = {
+            "requests": 0,
+            "estimated_tokens": 0,
+            "max_estimated_tokens": 0,
+            "measured_requests": 0,
+            "measured_tokens": 0,
+            "truncated_requests": 0
+        }
+    
+    def _build_messages(self, user_message: str, context: Dict[str, Any] = None,
+                        history: List[Dict[str, Any]] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """Build the chat completion messages and a report of the prompt's token usage"""
+        context_text, history_messages, report = encode_context(context, history, self.context_token_budget)
         
-        # Build the user prompt with context
         user_prompt = f"User message: {user_message}"
+        if context_text:
+            user_prompt += f"\n\nAvailable context:\n{context_text}"
         
-        if context:
-            context_str = "\n".join([f"{k}: {v}" for k, v in context.items()])
-            user_prompt += f"\n\nAvailable context:\n{context_str}"
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, *history_messages, {"role": "user", "content": user_prompt}]
+        report["estimated_prompt_tokens"] = sum(
+            estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages
+        )
+        report["prompt_tokens"] = None
+        return messages, report
+    
+    def _cache_context(self, context: Dict[str, Any], history: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Context used as the cache key; prior turns change the answer, so they are part of it"""
+        if not history:
+            return context
+        return {**(context or {}), "_history": [(turn.get("user_message"), turn.get("ai_response")) for turn in history]}
+    
+    def _record_usage(self, report: Dict[str, Any], usage: Any, target: Dict[str, Any] = None):
+        """Add the provider's measured prompt tokens to the report and the running totals"""
+        measured = getattr(usage, "prompt_tokens", None) if usage is not None else None
+        report["prompt_tokens"] = measured
+        self.prompt_stats["requests"] += 1
+        metrics.LLM_ESTIMATED_PROMPT_TOKENS.observe(report["estimated_prompt_tokens"])
+        self.prompt_stats["estimated_tokens"] += report["estimated_prompt_tokens"]
+        self.prompt_stats["max_estimated_tokens"] = max(self.prompt_stats["max_estimated_tokens"],
+                                                        report["estimated_prompt_tokens"])
+        if measured is not None:
+            self.prompt_stats["measured_requests"] += 1
+            self.prompt_stats["measured_tokens"] += measured
+        if report["rows_dropped"] or report["sections_dropped"]:
+            self.prompt_stats["truncated_requests"] += 1
+        if target is not None:
+            target.update(report)
+    
+    def get_prompt_stats(self) -> Dict[str, Any]:
+        stats = dict(self.prompt_stats)
+        requests = stats["requests"]
+        stats["avg_estimated_tokens"] = round(stats["estimated_tokens"] / requests, 1) if requests else 0.0
+        measured = stats["measured_requests"]
+        stats["avg_measured_tokens"] = round(stats["measured_tokens"] / measured, 1) if measured else None
+        stats["context_token_budget"] = self.context_token_budget
+        return stats
+    
+    def _degraded_response(self, context: Dict[str, Any], error: Exception, report: Dict[str, Any] = None) -> str:
+        """Answer from the context alone when the LLM call failed or was refused"""
+        if report is not None:
+            report["degraded"] = getattr(error, "reason", "error")
+        description = describe_context(context)
+        if not description:
+            return FALLBACK_RESPONSE
+        return f"{DEGRADED_PREFIX}\n{description}"
+    
+    async def _acomplete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                         purpose: str = "answer"):
+        """Async chat completion; identical concurrent prompts share one API call"""
+        async def create():
+            start = time.perf_counter()
+            try:
+                completion = await self.llm.acreate(
+                    messages=messages,
+                    model=self.model,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            except Exception:
+                metrics.LLM_ERRORS.inc(purpose=purpose)
+                raise
+            metrics.LLM_REQUEST_DURATION.observe(time.perf_counter() - start, purpose=purpose)
+            # Counted once per API call, however many callers share it
+            metrics.record_llm_usage(getattr(completion, "usage", None))
+            return completion
+        
+        if not single_flight.SINGLE_FLIGHT_ENABLED:
+            return await create()
+        payload = json.dumps([self.model, temperature, max_tokens, messages], sort_keys=True)
+        return await single_flight.llm_flight.do(hashlib.sha256(payload.encode()).hexdigest(), create)
+    
+    async def agenerate_response(self, user_message: str, context: Dict[str, Any] = None,
+                                 history: List[Dict[str, Any]] = None, report: Dict[str, Any] = None) -> str:
+        """Generate AI response using the async Groq client; report is filled with the prompt's token usage"""
+        cache_context = self._cache_context(context, history)
+        if self.response_cache:
+            cached = await self.response_cache.aget(user_message, cache_context)
+            if cached is not None:
+                return cached
         
         try:
-            completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            messages, prompt_report = self._build_messages(user_message, context, history)
+            completion = await self._acomplete(messages, temperature=0.7, max_tokens=500)
+            self._record_usage(prompt_report, getattr(completion, "usage", None), report)
+            
+            response = completion.choices[0].message.content
+            if self.response_cache:
+                await self.response_cache.aset(user_message, cache_context, response)
+            return response
+            
+        except Exception as e:
+            logger.error("Error calling Groq API: %s", e)
+            return self._degraded_response(context, e, report)
+    
+    async def astream_response(self, user_message: str, context: Dict[str, Any] = None,
+                               history: List[Dict[str, Any]] = None,
+                               report: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Stream AI response tokens as Groq produces them"""
+        # Not coalesced by single_flight: each caller reads its own token stream, and sharing one
+        # would mean replaying it to every subscriber. Repeats are answered from the response cache
+        cache_context = self._cache_context(context, history)
+        if self.response_cache:
+            cached = await self.response_cache.aget(user_message, cache_context)
+            if cached is not None:
+                yield cached
+                return
+        
+        produced = False
+        tokens = []
+        try:
+            messages, prompt_report = self._build_messages(user_message, context, history)
+            start = time.perf_counter()
+            stream = self.llm.astream(
+                messages=messages,
                 model=self.model,
                 temperature=0.7,
                 max_tokens=500
             )
             
-            return completion.choices[0].message.content
+            usage = None
+            async for chunk in stream:
+                # Groq reports usage on the last chunk under x_groq
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    produced = True
+                    tokens.append(token)
+                    yield token
+            metrics.LLM_REQUEST_DURATION.observe(time.perf_counter() - start, purpose="stream")
+            metrics.record_llm_usage(usage)
+            self._record_usage(prompt_report, usage, report)
             
+            if self.response_cache and tokens:
+                await self.response_cache.aset(user_message, cache_context, "".join(tokens))
+                    
         except Exception as e:
-            print(f"Error calling Groq API: {e}")
-            return "I apologize, but I'm having trouble processing your request right now. Please try again later."
+            metrics.LLM_ERRORS.inc(purpose="stream")
+            logger.error("Error streaming from Groq API: %s", e)
+            if produced:
+                # The caller has part of an answer; it must not pass for a whole one
+                raise
+            yield self._degraded_response(context, e, report)
     
-    def extract_intent(self, message: str) -> Dict[str, Any]:
-        """Extract intent and entities from user message"""
+    def _intent_messages(self, message: str) -> List[Dict[str, str]]:
+        """Build the intent classification prompt"""
         intent_prompt = f"""
         Analyze the following customer message and extract the intent and relevant information:
         
@@ -60,43 +222,45 @@ class LLMService:
         - entities: relevant information like product names, order IDs, etc.
         - requires_clarification: boolean indicating if more info is needed
         """
+        return [
+            {"role": "system", "content": "You are an intent classification system. Return only valid JSON."},
+            {"role": "user", "content": intent_prompt}
+        ]
+    
+    def _merge_llm_intent(self, local: Dict[str, Any], response: str) -> Dict[str, Any]:
+        """Prefer a valid LLM classification, keeping locally extracted entities"""
+        parsed = parse_llm_intent(response)
+        if not parsed:
+            return local
+        
+        entities = dict(local["entities"])
+        entities.update({k: v for k, v in parsed["entities"].items() if v})
+        return {
+            **local,
+            "intent": parsed["intent"],
+            "intents": [parsed["intent"]] + [intent for intent in local["intents"] if intent != parsed["intent"]],
+            "entities": entities,
+            "requires_clarification": parsed["requires_clarification"],
+            "source": "llm"
+        }
+    
+    def _needs_fallback(self, local: Dict[str, Any]) -> bool:
+        # Several strong intents lower the confidence without making the message ambiguous
+        if len(local.get("intents", ())) > 1:
+            return False
+        return self.intent_llm_fallback and local["confidence"] < self.intent_confidence_threshold
+    
+    async def aextract_intent(self, message: str) -> Dict[str, Any]:
+        """Extract intent and entities from user message using the async Groq client for fallback"""
+        local = self.intent_classifier.classify(message)
+        if not self._needs_fallback(local):
+            return local
         
         try:
-            completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are an intent classification system. Return only valid JSON."},
-                    {"role": "user", "content": intent_prompt}
-                ],
-                model=self.model,
-                temperature=0.1,
-                max_tokens=200
-            )
-            
-            # Parse the response (this is a simplified version)
-            response = completion.choices[0].message.content
-            
-            # Simple intent extraction (in a real system, you'd use proper NLP)
-            message_lower = message.lower()
-            
-            if any(word in message_lower for word in ["order", "status", "tracking"]):
-                intent = "order_status"
-            elif any(word in message_lower for word in ["stock", "available", "quantity"]):
-                intent = "stock_check"
-            elif any(word in message_lower for word in ["product", "item", "clothing"]):
-                intent = "product_query"
-            else:
-                intent = "general_help"
-            
-            return {
-                "intent": intent,
-                "entities": {},
-                "requires_clarification": False
-            }
+            completion = await self._acomplete(self._intent_messages(message), temperature=0.1, max_tokens=200,
+                                             purpose="intent")
+            return self._merge_llm_intent(local, completion.choices[0].message.content)
             
         except Exception as e:
-            print(f"Error extracting intent: {e}")
-            return {
-                "intent": "general_help",
-                "entities": {},
-                "requires_clarification": False
-            } 
\ No newline at end of file
+            logger.error("Error extracting intent: %s", e)
+            return local
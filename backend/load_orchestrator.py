@@ -0,0 +1,223 @@
+"""Parallel, dependency-ordered CSV loading with resumable per-shard checkpoints"""
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Set, Tuple
+
+import pandas as pd
+
+from database import Base
+from table_schemas import TABLE_SCHEMAS, RejectWriter, read_csv_kwargs
+
+def dependency_graph(table_names: List[str]) -> Dict[str, Set[str]]:
+    """Map each table to the tables it references through foreign keys"""
+    graph = {}
+    for table_name in table_names:
+        table = Base.metadata.tables[table_name]
+        graph[table_name] = {
+            fk.column.table.name for fk in table.foreign_keys
+            if fk.column.table.name in table_names and fk.column.table.name != table_name
+        }
+    return graph
+
+def plan_shards(csv_path: str, shard_bytes: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """Split a CSV into (start, end) byte ranges aligned to line boundaries"""
+    # Assumes no quoted field spans lines, which holds for the e-commerce exports
+    size = os.path.getsize(csv_path)
+    shards = []
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        position = f.tell()
+        while position < size:
+            f.seek(min(position + shard_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            shards.append((position, end))
+            position = end
+    return header, shards
+
+class ShardReader(io.RawIOBase):
+    """Read-only stream over the CSV header followed by one byte range of the file"""
+
+    def __init__(self, csv_path: str, header: bytes, start: int, end: int):
+        self.file = open(csv_path, "rb")
+        self.file.seek(start)
+        self.pending = header
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.pending:
+            n = min(len(buffer), len(self.pending))
+            buffer[:n] = self.pending[:n]
+            self.pending = self.pending[n:]
+            return n
+        if self.remaining <= 0:
+            return 0
+        data = self.file.read(min(len(buffer), self.remaining))
+        self.remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+def _init_worker():
+    # Connections inherited from the parent must not be reused by the child
+    from database import engine
+    engine.dispose(close=False)
+
+def load_shard(table_name: str, csv_path: str, header: bytes, start: int, end: int,
+               shard_index: int, reject_dir: str, chunk_size: int) -> Dict[str, Any]:
+    """Worker entry point: load one shard atomically"""
+    import bulk_loader
+
+    reader = io.BufferedReader(ShardReader(csv_path, header, start, end))
+    try:
+        chunks = pd.read_csv(reader, chunksize=chunk_size, **read_csv_kwargs(table_name))
+        stats = bulk_loader.load_chunks(
+            table_name,
+            chunks,
+            reject_writer=RejectWriter(reject_dir, suffix=f"shard{shard_index:05d}"),
+            description=f"{csv_path} shard {shard_index} [{start}:{end}]",
+            single_transaction=True
+        )
+    finally:
+        reader.close()
+    stats["shard"] = shard_index
+    return stats
+
+class Checkpoint:
+    """Per-table record of finished shards, invalidated when the CSV or shard size changes"""
+
+    def __init__(self, checkpoint_dir: str, table_name: str, csv_path: str, shard_bytes: int):
+        self.path = os.path.join(checkpoint_dir, f"{table_name}.json")
+        stat = os.stat(csv_path)
+        self.signature = {
+            "csv_path": os.path.abspath(csv_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "shard_bytes": shard_bytes
+        }
+        self.done: Dict[str, Any] = {}
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved.get("signature") == self.signature:
+                self.done = saved.get("done", {})
+
+    def is_done(self, shard_index: int) -> bool:
+        return str(shard_index) in self.done
+
+    def mark_done(self, shard_index: int, stats: Dict[str, Any]):
+        self.done[str(shard_index)] = {"rows": stats["rows"], "rejected": stats["rejected"]}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"signature": self.signature, "done": self.done}, f)
+        os.replace(tmp_path, self.path)
+
+def run_parallel_load(data_dir: str = "data", workers: int = None, shard_bytes: int = 64 * 1024 * 1024,
+                      checkpoint_dir: str = ".load_checkpoints", reject_dir: str = "rejects",
+                      chunk_size: int = 50000) -> List[Dict[str, Any]]:
+    """Load every table CSV in data_dir in parallel; returns per-table throughput stats"""
+    workers = workers or os.cpu_count() or 1
+    files = {
+        table_name: os.path.join(data_dir, f"{table_name}.csv")
+        for table_name in TABLE_SCHEMAS
+        if os.path.exists(os.path.join(data_dir, f"{table_name}.csv"))
+    }
+    for table_name in TABLE_SCHEMAS:
+        if table_name not in files:
+            print(f"{table_name.replace('_', ' ').capitalize()} file not found in {data_dir}")
+
+    graph = dependency_graph(list(files))
+    waiting = set(files)
+    completed: Set[str] = set()
+    failed: Set[str] = set()
+    table_stats = {
+        table_name: {"table": table_name, "method": "parallel", "rows": 0, "rejected": 0,
+                     "shards": 0, "shards_skipped": 0, "shards_failed": 0, "started": None, "finished": None}
+        for table_name in files
+    }
+    checkpoints: Dict[str, Checkpoint] = {}
+    outstanding: Dict[str, int] = {}
+    futures = {}
+
+    def finish(table_name: str):
+        stats = table_stats[table_name]
+        stats["finished"] = time.perf_counter()
+        (failed if stats["shards_failed"] else completed).add(table_name)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+
+        def schedule_ready():
+            for table_name in sorted(waiting):
+                parents = graph[table_name]
+                if parents & failed:
+                    print(f"Skipping {table_name}: a referenced table failed to load")
+                    waiting.discard(table_name)
+                    failed.add(table_name)
+                    continue
+                if not parents <= completed:
+                    continue
+
+                waiting.discard(table_name)
+                csv_path = files[table_name]
+                header, shards = plan_shards(csv_path, shard_bytes)
+                checkpoint = Checkpoint(checkpoint_dir, table_name, csv_path, shard_bytes)
+                checkpoints[table_name] = checkpoint
+                stats = table_stats[table_name]
+                stats["shards"] = len(shards)
+                stats["started"] = time.perf_counter()
+
+                outstanding[table_name] = 0
+                for shard_index, (start, end) in enumerate(shards):
+                    if checkpoint.is_done(shard_index):
+                        stats["shards_skipped"] += 1
+                        continue
+                    future = executor.submit(load_shard, table_name, csv_path, header, start, end,
+                                             shard_index, reject_dir, chunk_size)
+                    futures[future] = (table_name, shard_index)
+                    outstanding[table_name] += 1
+                print(f"Scheduled {outstanding[table_name]} of {len(shards)} shards for {table_name}")
+                if outstanding[table_name] == 0:
+                    finish(table_name)
+                    schedule_ready()
+                    return
+
+        schedule_ready()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                table_name, shard_index = futures.pop(future)
+                stats = table_stats[table_name]
+                try:
+                    result = future.result()
+                    checkpoints[table_name].mark_done(shard_index, result)
+                    stats["rows"] += result["rows"]
+                    stats["rejected"] += result["rejected"]
+                except Exception as e:
+                    print(f"Error loading {table_name} shard {shard_index}: {e}")
+                    stats["shards_failed"] += 1
+
+                outstanding[table_name] -= 1
+                if outstanding[table_name] == 0:
+                    finish(table_name)
+            schedule_ready()
+
+    results = []
+    for table_name in files:
+        stats = table_stats[table_name]
+        elapsed = (stats["finished"] - stats["started"]) if stats["started"] and stats["finished"] else 0.0
+        stats["seconds"] = round(elapsed, 3)
+        stats["rows_per_sec"] = round(stats["rows"] / elapsed, 1) if elapsed > 0 else 0.0
+        del stats["started"], stats["finished"]
+        results.append(stats)
+    return results
@@ -1,14 +1,34 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Dict, Any
+import asyncio
+import json
+import logging
+import time
 import uuid
 import os
 
-from database import get_db, create_tables, Conversation
+from database import get_db, create_tables, get_pool_stats
+import db_pool
 from models import ChatRequest, ChatResponse, ProductResponse, OrderResponse
 from llm_service import LLMService
-from business_logic import BusinessLogicService
+from business_logic import BusinessLogicService, AsyncBusinessLogicService
+import delta_ingest
+import rollups
+import stock_summary
+import product_search
+import entity_recognizer
+from conversation_logger import conversation_logger
+import conversation_store
+import context_encoder
+import single_flight
+import metrics
+import admission
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="E-commerce Chatbot API", version="1.0.0")
 
@@ -19,90 +39,341 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Request latency and in-flight gauge for every route
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Initialize LLM service
 llm_service = LLMService()
 
+def _pool_values(field: str):
+    return lambda: {(name,): status[field] for name, status in get_pool_stats().items() if field in status}
+
+def _flight_values(field: str):
+    return lambda: {(flight["name"],): flight[field] for flight in single_flight.stats()["flights"]}
+
+# Circuit breaker state as a number: 0 closed, 1 half-open, 2 open
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+def _llm_values(field: str):
+    return lambda: {(): llm_service.llm.stats()[field]}
+
+# Gauges and counters read from their components at scrape time
+for metric in [
+    metrics.Gauge("db_pool_checked_out", "Connections checked out of the pool", ["engine"],
+                  callback=_pool_values("checked_out")),
+    metrics.Gauge("db_pool_overflow", "Overflow connections open beyond the pool size", ["engine"],
+                  callback=_pool_values("overflow")),
+    metrics.Counter("db_pool_checkout_timeouts_total", "Checkouts that timed out waiting for a connection", ["engine"],
+                    callback=_pool_values("timeouts")),
+    metrics.Gauge("conversation_log_queue_depth", "Exchanges waiting to be written",
+                  callback=lambda: {(): conversation_logger.stats()["queue_depth"]}),
+    metrics.Counter("conversation_log_dropped_total", "Exchanges given up on after failed writes",
+                    callback=lambda: {(): conversation_logger.stats()["dropped"]}),
+    metrics.Counter("single_flight_calls_total", "Calls made through request coalescing", ["flight"],
+                    callback=_flight_values("calls")),
+    metrics.Counter("single_flight_collapsed_total", "Calls served by an execution already in flight", ["flight"],
+                    callback=_flight_values("collapsed")),
+    metrics.Gauge("llm_circuit_state", "LLM circuit breaker state (0 closed, 1 half-open, 2 open)",
+                  callback=lambda: {(): CIRCUIT_STATE_VALUES[llm_service.llm.breaker.state]}),
+    metrics.Counter("llm_circuit_rejections_total", "LLM calls refused while the circuit was open",
+                    callback=lambda: {(): llm_service.llm.breaker.stats()["rejected"]}),
+    metrics.Gauge("llm_requests_in_flight", "LLM completions holding a concurrency slot",
+                  callback=_llm_values("in_flight")),
+    metrics.Gauge("llm_requests_waiting", "LLM completions waiting for a concurrency slot",
+                  callback=_llm_values("waiting")),
+    metrics.Counter("llm_retries_total", "LLM attempts retried after a transient error",
+                    callback=_llm_values("retries")),
+    metrics.Counter("llm_overloaded_total", "LLM calls refused because no concurrency slot freed up",
+                    callback=_llm_values("overloaded")),
+    metrics.Gauge("chat_admission_in_flight", "Chat requests admitted and running",
+                  callback=lambda: {(): admission.chat_admission.in_flight}),
+    metrics.Gauge("chat_admission_queue_depth", "Chat requests waiting for admission",
+                  callback=lambda: {(): len(admission.chat_admission.queue)}),
+    metrics.Counter("chat_admission_rejected_total", "Chat requests shed by admission control", ["reason"],
+                    callback=lambda: {(reason,): count for reason, count in admission.chat_admission.rejected.items()}),
+]:
+    metrics.registry.register(metric)
+
+# Seconds between background rollup rebuilds (0 disables)
+ROLLUP_REFRESH_INTERVAL = int(os.getenv("ROLLUP_REFRESH_INTERVAL", "300"))
+
+async def refresh_rollups_periodically():
+    """Rebuild the sales rollups on a fixed interval, unless another worker is rebuilding or just did"""
+    while True:
+        await asyncio.sleep(ROLLUP_REFRESH_INTERVAL)
+        try:
+            await asyncio.to_thread(rollups.refresh_all, wait=False, max_age=ROLLUP_REFRESH_INTERVAL * 0.9)
+        except Exception as e:
+            logger.error("Error refreshing sales rollups: %s", e)
+
 @app.on_event("startup")
 async def startup_event():
     """Create database tables on startup"""
     create_tables()
+    
+    # Build the rollups once if they have never been built
+    try:
+        if rollups.needs_refresh():
+            # Workers starting together build them once; the others skip while it holds the lock
+            await asyncio.to_thread(rollups.refresh_all, wait=False)
+    except Exception as e:
+        logger.error("Error building sales rollups: %s", e)
+    
+    try:
+        if stock_summary.needs_refresh():
+            await asyncio.to_thread(stock_summary.refresh_all)
+    except Exception as e:
+        logger.error("Error building product stock: %s", e)
+    
+    try:
+        await asyncio.to_thread(product_search.search_index.warm)
+    except Exception as e:
+        logger.error("Error building product search index: %s", e)
+    
+    try:
+        await asyncio.to_thread(entity_recognizer.recognizer.warm)
+    except Exception as e:
+        logger.error("Error building entity recognizer: %s", e)
+    
+    if ROLLUP_REFRESH_INTERVAL > 0:
+        app.state.rollup_task = asyncio.create_task(refresh_rollups_periodically())
+    
+    conversation_logger.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and flush queued conversations"""
+    rollup_task = getattr(app.state, "rollup_task", None)
+    if rollup_task:
+        rollup_task.cancel()
+    
+    await conversation_logger.stop()
 
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "E-commerce Chatbot API is running!"}
 
-@app.post("/api/chat", response_model=ChatResponse)
+# Seconds each context lookup may take; a lookup that runs over is left out of the context
+LOOKUP_TIMEOUT = float(os.getenv("LOOKUP_TIMEOUT", "2"))
+LOOKUP_TIMEOUTS = {
+    lookup: float(os.getenv(f"LOOKUP_TIMEOUT_{lookup.upper()}", LOOKUP_TIMEOUT))
+    for lookup in ("order", "stock", "top_products", "search")
+}
+
+async def lookup_order(message: str, entities: Dict[str, Any], business_logic: AsyncBusinessLogicService) -> Dict[str, Any]:
+    order_id = entities.get("order_id") or business_logic.extract_order_id(message)
+    if not order_id:
+        return {}
+    order_info = await business_logic.get_order_status(order_id)
+    if "error" not in order_info:
+        return {"order_info": order_info}
+    return {"order_error": order_info["error"]}
+
+async def lookup_stock(message: str, entities: Dict[str, Any], business_logic: AsyncBusinessLogicService) -> Dict[str, Any]:
+    # A catalog name or SKU resolves straight to the product ID
+    product_id = await business_logic.resolve_product_id(message)
+    product_name = entities.get("product_name") or business_logic.extract_product_name(message)
+    if not (product_id or product_name):
+        return {}
+    stock_info = await business_logic.get_product_stock(product_name=product_name, product_id=product_id)
+    if "error" not in stock_info:
+        return {"stock_info": stock_info}
+    return {"stock_error": stock_info["error"]}
+
+async def lookup_top_products(message: str, entities: Dict[str, Any],
+                              business_logic: AsyncBusinessLogicService) -> Dict[str, Any]:
+    return {"top_products": await business_logic.get_top_products(5)}
+
+async def lookup_search(message: str, entities: Dict[str, Any], business_logic: AsyncBusinessLogicService) -> Dict[str, Any]:
+    return {"products": await business_logic.search_products(message)}
+
+def plan_lookups(message: str, intents: list) -> list:
+    """Names of the lookups the intents of a message need"""
+    lookups = []
+    if "order_status" in intents:
+        lookups.append("order")
+    if "stock_check" in intents:
+        lookups.append("stock")
+    if "product_query" in intents:
+        # Check for top products query, otherwise search for specific products
+        if "top" in message.lower() and ("product" in message.lower() or "sold" in message.lower()):
+            lookups.append("top_products")
+        else:
+            lookups.append("search")
+    return lookups
+
+LOOKUPS = {
+    "order": lookup_order,
+    "stock": lookup_stock,
+    "top_products": lookup_top_products,
+    "search": lookup_search,
+}
+
+async def run_lookup(name: str, message: str, entities: Dict[str, Any],
+                     business_logic: AsyncBusinessLogicService) -> Dict[str, Any]:
+    """Run one lookup within its timeout; failures leave its part of the context out"""
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(LOOKUPS[name](message, entities, business_logic), LOOKUP_TIMEOUTS[name])
+    except asyncio.TimeoutError:
+        metrics.CHAT_LOOKUP_TIMEOUTS.inc(lookup=name)
+        logger.warning("Error in %s lookup: timed out after %ss", name, LOOKUP_TIMEOUTS[name])
+        return {f"{name}_error": "This information could not be looked up in time."}
+    except Exception as e:
+        logger.error("Error in %s lookup: %s", name, e)
+        return {}
+    finally:
+        metrics.CHAT_LOOKUP_DURATION.observe(time.perf_counter() - start, lookup=name)
+
+async def build_chat_context(message: str, business_logic: AsyncBusinessLogicService,
+                             endpoint: str = "chat") -> Dict[str, Any]:
+    """Extract the intents of a message and gather the data needed to answer them concurrently"""
+    # Extract intents and entities
+    with metrics.stage(endpoint, "intent"):
+        intent_info = await llm_service.aextract_intent(message)
+    intents = intent_info.get("intents") or [intent_info.get("intent", "general_help")]
+    entities = intent_info.get("entities", {})
+    
+    # Look up the data the intents need and merge it into one context
+    context = {}
+    with metrics.stage(endpoint, "lookup"):
+        results = await asyncio.gather(*[
+            run_lookup(name, message, entities, business_logic) for name in plan_lookups(message, intents)
+        ])
+    for result in results:
+        context.update(result)
+    
+    return context
+
+async def load_history(conversation_id: str, db: Session) -> list:
+    """Prior turns of an existing conversation for the prompt; empty for a new one"""
+    if not conversation_id or context_encoder.CONTEXT_HISTORY_TURNS <= 0:
+        return []
+    try:
+        return await asyncio.to_thread(
+            conversation_store.recent_turns, db, conversation_id, context_encoder.CONTEXT_HISTORY_TURNS,
+            conversation_logger.pending_rows(conversation_id)
+        )
+    except Exception as e:
+        logger.error("Error loading conversation history: %s", e)
+        return []
+
+async def admit_chat(http_request: Request):
+    """Admission control for the chat endpoints; the slot is held until the response is sent"""
+    if not admission.ADMISSION_ENABLED:
+        yield
+        return
+    # Per client IP: a conversation_id is chosen by the client, so a fresh one would skip the limit
+    client_key = http_request.client.host if http_request.client else "unknown"
+    try:
+        admitted_at = await admission.chat_admission.acquire(client_key)
+    except admission.AdmissionRejected as e:
+        detail = "Too many requests" if e.status_code == 429 else "Server busy, please retry"
+        raise HTTPException(status_code=e.status_code, detail=detail, headers={"Retry-After": str(e.retry_after)})
+    try:
+        yield
+    finally:
+        admission.chat_admission.release(admitted_at)
+
+@app.post("/api/chat", response_model=ChatResponse, dependencies=[Depends(admit_chat)])
 async def chat(request: ChatRequest, db: Session = Depends(get_db)):
     """Main chat endpoint"""
     try:
         # Generate conversation ID if not provided
         conversation_id = request.conversation_id or str(uuid.uuid4())
         
-        # Initialize business logic service
-        business_logic = BusinessLogicService(db)
-        
-        # Extract intent and entities
-        intent_info = llm_service.extract_intent(request.message)
-        intent = intent_info.get("intent", "general_help")
+        # Initialize business logic service (queries run in the threadpool)
+        business_logic = AsyncBusinessLogicService(db)
         
-        # Build context based on intent
-        context = {}
+        # Extract intent and look up the data it needs
+        context = await build_chat_context(request.message, business_logic)
+        with metrics.stage("chat", "history"):
+            history = await load_history(request.conversation_id, db)
         
-        if intent == "order_status":
-            order_id = business_logic.extract_order_id(request.message)
-            if order_id:
-                order_info = business_logic.get_order_status(order_id)
-                if "error" not in order_info:
-                    context["order_info"] = order_info
-                else:
-                    context["order_error"] = order_info["error"]
+        # Generate AI response within the prompt token budget
+        prompt = {}
+        with metrics.stage("chat", "generate"):
+            ai_response = await llm_service.agenerate_response(request.message, context, history, prompt)
         
-        elif intent == "stock_check":
-            product_name = business_logic.extract_product_name(request.message)
-            if product_name:
-                stock_info = business_logic.get_product_stock(product_name=product_name)
-                if "error" not in stock_info:
-                    context["stock_info"] = stock_info
-                else:
-                    context["stock_error"] = stock_info["error"]
-        
-        elif intent == "product_query":
-            # Check for top products query
-            if "top" in request.message.lower() and ("product" in request.message.lower() or "sold" in request.message.lower()):
-                top_products = business_logic.get_top_products(5)
-                context["top_products"] = top_products
-            else:
-                # Search for specific products
-                products = business_logic.search_products(request.message)
-                context["products"] = products
-        
-        # Generate AI response
-        ai_response = llm_service.generate_response(request.message, context)
-        
-        # Save conversation to database
-        conversation = Conversation(
-            conversation_id=conversation_id,
-            user_message=request.message,
-            ai_response=ai_response
-        )
-        db.add(conversation)
-        db.commit()
+        # Persisted by the write-behind logger, off the response path
+        with metrics.stage("chat", "persist"):
+            await conversation_logger.log(conversation_id, request.message, ai_response)
         
         return ChatResponse(
             response=ai_response,
             conversation_id=conversation_id,
-            timestamp=datetime.utcnow()
+            timestamp=datetime.utcnow(),
+            prompt=prompt or None
         )
         
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/api/chat/stream", dependencies=[Depends(admit_chat)])
+async def chat_stream(request: ChatRequest, db: Session = Depends(get_db)):
+    """Chat endpoint that streams response tokens over server-sent events"""
+    started = time.perf_counter()
+    try:
+        conversation_id = request.conversation_id or str(uuid.uuid4())
+        business_logic = AsyncBusinessLogicService(db)
+        context = await build_chat_context(request.message, business_logic, endpoint="chat_stream")
+        with metrics.stage("chat_stream", "history"):
+            history = await load_history(request.conversation_id, db)
+    except Exception as e:
+        logger.error("Error in chat stream endpoint: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    async def event_stream():
+        yield sse_event("start", {"conversation_id": conversation_id})
+        
+        tokens = []
+        prompt = {}
+        try:
+            with metrics.stage("chat_stream", "generate"):
+                async for token in llm_service.astream_response(request.message, context, history, prompt):
+                    if not tokens:
+                        metrics.CHAT_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started)
+                    tokens.append(token)
+                    yield sse_event("token", {"token": token})
+        except Exception:
+            # The partial answer is neither stored nor sent as done
+            yield sse_event("error", {
+                "detail": "The response was interrupted. Please try again.",
+                "conversation_id": conversation_id
+            })
+            return
+        
+        ai_response = "".join(tokens)
+        try:
+            with metrics.stage("chat_stream", "persist"):
+                await conversation_logger.log(conversation_id, request.message, ai_response)
+        except Exception as e:
+            logger.error("Error saving streamed conversation: %s", e)
+        
+        yield sse_event("done", {
+            "response": ai_response,
+            "conversation_id": conversation_id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "prompt": prompt or None
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/products", response_model=list[ProductResponse])
-async def get_products(db: Session = Depends(get_db)):
+def get_products(db: Session = Depends(get_db)):
     """Get all products"""
     try:
         from database import Product
@@ -123,7 +394,7 @@ async def get_products(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to retrieve products")
 
 @app.get("/api/products/top")
-async def get_top_products(limit: int = 5, db: Session = Depends(get_db)):
+def get_top_products(limit: int = 5, db: Session = Depends(get_db)):
     """Get top selling products"""
     try:
         business_logic = BusinessLogicService(db)
@@ -133,8 +404,19 @@ async def get_top_products(limit: int = 5, db: Session = Depends(get_db)):
         print(f"Error getting top products: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve top products")
 
+@app.get("/api/products/search")
+def search_products(q: str, limit: int = 10, db: Session = Depends(get_db)):
+    """Ranked product search over names, brands, categories and departments"""
+    try:
+        business_logic = BusinessLogicService(db)
+        products = business_logic.search_products(q, min(max(limit, 1), 100))
+        return {"query": q, "products": products}
+    except Exception as e:
+        logger.error("Error searching products: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to search products")
+
 @app.get("/api/orders/{order_id}")
-async def get_order_status(order_id: str, db: Session = Depends(get_db)):
+def get_order_status(order_id: str, db: Session = Depends(get_db)):
     """Get order status by order ID"""
     try:
         business_logic = BusinessLogicService(db)
@@ -145,7 +427,7 @@ async def get_order_status(order_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to retrieve order information")
 
 @app.get("/api/products/stock/{product_name}")
-async def get_product_stock(product_name: str, db: Session = Depends(get_db)):
+def get_product_stock(product_name: str, db: Session = Depends(get_db)):
     """Get stock information for a product"""
     try:
         business_logic = BusinessLogicService(db)
@@ -156,7 +438,7 @@ async def get_product_stock(product_name: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to retrieve product information")
 
 @app.get("/api/analytics/sales")
-async def get_sales_analytics(db: Session = Depends(get_db)):
+def get_sales_analytics(db: Session = Depends(get_db)):
     """Get sales analytics"""
     try:
         business_logic = BusinessLogicService(db)
@@ -167,7 +449,7 @@ async def get_sales_analytics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to retrieve analytics")
 
 @app.get("/api/products/low-stock")
-async def get_low_stock_products(threshold: int = 10, db: Session = Depends(get_db)):
+def get_low_stock_products(threshold: int = 10, db: Session = Depends(get_db)):
     """Get products with low stock"""
     try:
         business_logic = BusinessLogicService(db)
@@ -177,25 +459,109 @@ async def get_low_stock_products(threshold: int = 10, db: Session = Depends(get_
         print(f"Error getting low stock products: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve low stock products")
 
+@app.get("/api/entities/stats")
+def get_entity_stats(db: Session = Depends(get_db)):
+    """Get the catalog entity recognizer's size and memory footprint"""
+    try:
+        return entity_recognizer.recognizer.get(db).memory_report()
+    except Exception as e:
+        logger.error("Error getting entity stats: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to retrieve entity stats")
+
+@app.get("/api/db/pool")
+def get_db_pool_stats():
+    """Get connection pool usage and checkout wait times for this worker"""
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    per_worker = db_pool.DB_POOL_SIZE + db_pool.DB_MAX_OVERFLOW
+    return {
+        "engines": get_pool_stats(),
+        "config": {
+            "pool_size": db_pool.DB_POOL_SIZE,
+            "max_overflow": db_pool.DB_MAX_OVERFLOW,
+            "pool_timeout": db_pool.DB_POOL_TIMEOUT,
+            "pool_recycle": db_pool.DB_POOL_RECYCLE,
+            "pool_pre_ping": db_pool.DB_POOL_PRE_PING,
+        },
+        # Upper bound on connections this deployment can open per engine
+        "workers": workers,
+        "max_connections_per_worker": per_worker,
+        "max_connections_total": per_worker * workers,
+    }
+
+@app.get("/api/conversation-log/stats")
+async def get_conversation_log_stats():
+    """Get write-behind conversation queue depth, flush and backpressure counters"""
+    return conversation_logger.stats()
+
+@app.get("/api/prompt/stats")
+async def get_prompt_stats():
+    """Get prompt token usage against the context token budget"""
+    return llm_service.get_prompt_stats()
+
+@app.get("/api/single-flight/stats")
+async def get_single_flight_stats():
+    """Get how many concurrent identical lookups and LLM calls were collapsed"""
+    return single_flight.stats()
+
+@app.get("/api/admission/stats")
+async def get_admission_stats():
+    """Chat admission control: slots in use, queue depth and rejections"""
+    return admission.chat_admission.stats()
+
+@app.get("/api/llm/status")
+async def get_llm_status():
+    """LLM client state: circuit breaker, concurrency slots, retries and failures"""
+    return llm_service.llm.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Get LLM response cache hit/miss counters"""
+    if not llm_service.response_cache:
+        return {"enabled": False}
+    return {"enabled": True, **llm_service.response_cache.stats()}
+
+@app.get("/api/ingest/status")
+def get_ingest_status():
+    """Get delta ingest high-water marks and lag per table"""
+    try:
+        return {"tables": delta_ingest.table_lag()}
+    except Exception as e:
+        logger.error("Error getting ingest status: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to retrieve ingest status")
+
 @app.get("/api/conversations")
-async def get_conversations(db: Session = Depends(get_db)):
-    """Get recent conversations"""
+def get_conversations(response: Response, limit: int = 50, cursor: str = None, db: Session = Depends(get_db)):
+    """Get recent exchanges, newest first; the X-Next-Cursor header is the cursor of the next page"""
     try:
-        conversations = db.query(Conversation).order_by(Conversation.created_at.desc()).limit(50).all()
-        return [
-            {
-                "id": conv.id,
-                "conversation_id": conv.conversation_id,
-                "user_message": conv.user_message,
-                "ai_response": conv.ai_response,
-                "created_at": conv.created_at
-            }
-            for conv in conversations
-        ]
+        conversations, next_cursor = conversation_store.list_recent(db, limit, cursor)
+        # The body stays a plain list, as it was before pagination
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return conversations
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error getting conversations: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve conversations")
 
+@app.get("/api/conversations/{conversation_id}/messages")
+def get_conversation_messages(conversation_id: str, limit: int = 50, cursor: str = None,
+                              db: Session = Depends(get_db)):
+    """Get a conversation's exchanges in turn order; pass next_cursor back for the next page"""
+    try:
+        messages, next_cursor = conversation_store.list_messages(db, conversation_id, limit, cursor)
+        return {"conversation_id": conversation_id, "messages": messages, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error getting conversation messages: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to retrieve conversation messages")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
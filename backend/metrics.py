@@ -0,0 +1,273 @@
+"""In-process metrics served at /metrics in the Prometheus text format"""
+import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Starlette appends the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Metric:
+    """A metric family: one value (or histogram) per combination of label values"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple, float]]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Values read at scrape time instead of recorded as they happen
+        self.callback = callback
+        self._values: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception as e:
+                logger.error("Error collecting metric %s: %s", self.name, e)
+                return []
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values.items()]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self._samples()]
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts (last is +Inf), sum
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Re-registering a name replaces the old family (callbacks after a reload)
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body is sent",
+    ["method", "route", "status"]))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being handled"))
+CHAT_STAGE_DURATION = registry.register(Histogram(
+    "chat_stage_duration_seconds", "Latency of each step of a chat request", ["endpoint", "stage"]))
+CHAT_LOOKUP_DURATION = registry.register(Histogram(
+    "chat_lookup_duration_seconds", "Latency of each context lookup of a chat request", ["lookup"]))
+CHAT_LOOKUP_TIMEOUTS = registry.register(Counter(
+    "chat_lookup_timeouts_total", "Context lookups abandoned after their timeout", ["lookup"]))
+CHAT_TIME_TO_FIRST_TOKEN = registry.register(Histogram(
+    "chat_time_to_first_token_seconds", "Time from request to the first streamed token"))
+BUSINESS_DURATION = registry.register(Histogram(
+    "business_method_duration_seconds", "Latency of BusinessLogicService methods", ["method"]))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "Database statement latency by statement type", ["statement"], QUERY_BUCKETS))
+DB_QUERY_ERRORS = registry.register(Counter(
+    "db_query_errors_total", "Database statements that raised", ["statement"]))
+LLM_REQUEST_DURATION = registry.register(Histogram(
+    "llm_request_duration_seconds", "Groq completion latency (whole stream for streamed responses)", ["purpose"]))
+LLM_ERRORS = registry.register(Counter(
+    "llm_errors_total", "Failed Groq completions", ["purpose"]))
+LLM_TOKENS = registry.register(Counter(
+    "llm_tokens_total", "Tokens reported by the Groq API", ["kind"]))
+LLM_ESTIMATED_PROMPT_TOKENS = registry.register(Histogram(
+    "llm_estimated_prompt_tokens", "Estimated prompt size of chat completions", buckets=TOKEN_BUCKETS))
+
+def render() -> str:
+    return registry.render()
+
+@contextmanager
+def stage(endpoint: str, name: str):
+    """Time one step of a chat request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        CHAT_STAGE_DURATION.observe(time.perf_counter() - start, endpoint=endpoint, stage=name)
+
+def timed(histogram: Histogram, label: str = "method"):
+    """Decorator observing a function's latency, labelled with its name"""
+    def decorator(func):
+        labels = {label: func.__name__}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+def record_llm_usage(usage: Any):
+    """Count prompt and completion tokens from a Groq usage object"""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            LLM_TOKENS.inc(tokens, kind=kind)
+
+STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY"}
+
+def _statement_type(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement and statement.strip() else ""
+    return verb if verb in STATEMENT_TYPES else "OTHER"
+
+def instrument_engine(engine: Engine):
+    """Time every statement executed through an engine"""
+    if getattr(engine, "_metrics_instrumented", False):
+        return
+    engine._metrics_instrumented = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            DB_QUERY_DURATION.observe(time.perf_counter() - starts.pop(), statement=_statement_type(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        starts = exception_context.connection.info.get("metrics_query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+        DB_QUERY_ERRORS.inc(statement=_statement_type(exception_context.statement))
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests by route template, streamed bodies included"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot grow the label set
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=scope["method"],
+                                          route=path, status=status["code"])
@@ -0,0 +1,238 @@
+"""Versioned schema migrations, applied at startup in place of a bare create_all
+
+Usage (from the backend directory):
+
+    python migrations.py              # apply pending migrations
+    python migrations.py --status     # list applied and pending versions
+    python migrations.py --explain    # check the hot queries use their indexes
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from database import engine as default_engine, Base, SchemaMigration
+
+# Arbitrary key for pg_advisory_lock
+MIGRATION_LOCK_KEY = 4141001
+
+def create_base_schema(connection: Connection):
+    Base.metadata.create_all(bind=connection)
+
+# (name, columns, WHERE clause of a partial index) per table, matched to the queries in business_logic.py
+HOT_PATH_INDEXES = {
+    "order_items": [
+        ("ix_order_items_order_id", "order_id", None),                          # order detail items
+        ("ix_order_items_product_id", "product_id", None),                      # per-product rollup refresh
+        ("ix_order_items_status_product", "status, product_id, sale_price", None),  # completed sales per product
+    ],
+    "inventory_items": [
+        ("ix_inventory_items_available", "product_id", "sold_at IS NULL"),      # unsold stock per product
+    ],
+    "orders": [
+        ("ix_orders_user_id", "user_id", None),
+        ("ix_orders_status", "status", None),                                   # completed order counts
+    ],
+    "conversations": [
+        ("ix_conversations_created_at", "created_at", None),                    # recent conversations
+    ],
+}
+
+def add_hot_path_indexes(connection: Connection):
+    for table_name, indexes in HOT_PATH_INDEXES.items():
+        for name, columns, where in indexes:
+            partial = f" WHERE {where}" if where else ""
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} ({columns}){partial}"))
+
+def multi_turn_conversations(connection: Connection):
+    """Allow many exchanges per conversation_id, numbered by turn"""
+    columns = {column["name"] for column in inspect(connection).get_columns("conversations")}
+    if "turn" not in columns:
+        # Existing conversation_ids were unique, so every existing row is turn 1
+        connection.execute(text("ALTER TABLE conversations ADD COLUMN turn INTEGER NOT NULL DEFAULT 1"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_conversations_conversation_id"))
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_conversations_conversation_turn ON conversations (conversation_id, turn)"
+    ))
+    # Keyset pagination orders by (created_at, id)
+    connection.execute(text("DROP INDEX IF EXISTS ix_conversations_created_at"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_conversations_created_id ON conversations (created_at, id)"))
+
+def order_item_natural_key(connection: Connection):
+    """Unique inventory_item_id, the key delta ingest upserts order_items on"""
+    # Missing IDs used to load as 0; NULLs do not collide in a unique index
+    connection.execute(text("UPDATE order_items SET inventory_item_id = NULL WHERE inventory_item_id = 0"))
+    duplicates = connection.execute(text(
+        "SELECT count(*) FROM (SELECT inventory_item_id FROM order_items WHERE inventory_item_id IS NOT NULL "
+        "GROUP BY inventory_item_id HAVING count(*) > 1) AS duplicated"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(f"{duplicates} inventory_item_id values appear on more than one order item; "
+                           "resolve them before upgrading")
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_order_items_inventory_item_id ON order_items (inventory_item_id)"
+    ))
+
+def product_updated_at(connection: Connection):
+    """products.updated_at, which the search index and entity recognizer watch for edits"""
+    columns = {column["name"] for column in inspect(connection).get_columns("products")}
+    if "updated_at" not in columns:
+        # SQLite cannot add a column with a non-constant default, so backfill instead
+        connection.execute(text("ALTER TABLE products ADD COLUMN updated_at TIMESTAMP"))
+        connection.execute(text("UPDATE products SET updated_at = CURRENT_TIMESTAMP"))
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("ALTER TABLE products ALTER COLUMN updated_at SET DEFAULT now()"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_products_updated_at ON products (updated_at)"))
+
+# Applied in order; never edit or renumber a migration once released. Version 1 already
+# creates the newest columns on a fresh database, so later migrations must be idempotent
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create base schema", create_base_schema),
+    (2, "add hot path indexes", add_hot_path_indexes),
+    (3, "multi-turn conversations", multi_turn_conversations),
+    (4, "order item natural key", order_item_natural_key),
+    (5, "product updated_at", product_updated_at),
+]
+
+def applied_versions(connection: Connection) -> Dict[int, datetime]:
+    table = SchemaMigration.__table__
+    return {row.version: row.applied_at for row in connection.execute(table.select())}
+
+def migrate(bind: Engine = None) -> List[int]:
+    """Apply pending migrations in order; returns the versions applied"""
+    bind = bind or default_engine
+    applied = []
+
+    with bind.connect() as connection:
+        postgres = connection.dialect.name == "postgresql"
+        if postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+        try:
+            with connection.begin():
+                SchemaMigration.__table__.create(bind=connection, checkfirst=True)
+            done = applied_versions(connection)
+            connection.commit()
+
+            for version, name, upgrade in MIGRATIONS:
+                if version in done:
+                    continue
+                with connection.begin():
+                    upgrade(connection)
+                    connection.execute(SchemaMigration.__table__.insert().values(
+                        version=version, name=name, applied_at=datetime.utcnow()
+                    ))
+                print(f"Applied migration {version}: {name}")
+                applied.append(version)
+        finally:
+            if postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                connection.commit()
+    return applied
+
+def status(bind: Engine = None) -> List[Dict[str, Any]]:
+    bind = bind or default_engine
+    with bind.connect() as connection:
+        SchemaMigration.__table__.create(bind=connection, checkfirst=True)
+        done = applied_versions(connection)
+        connection.commit()
+    return [
+        {"version": version, "name": name, "applied_at": done.get(version)}
+        for version, name, _ in MIGRATIONS
+    ]
+
+# (description, SQL, parameters, index the plan must use) for the hot queries in business_logic.py
+HOT_QUERIES = [
+    ("order detail items",
+     "SELECT id, product_id, status, sale_price FROM order_items WHERE order_id = :order_id",
+     {"order_id": 1}, "ix_order_items_order_id"),
+    ("unsold stock for one product",
+     "SELECT count(*) FROM inventory_items WHERE product_id = :product_id AND sold_at IS NULL",
+     {"product_id": 1}, "ix_inventory_items_available"),
+    ("completed sales per product",
+     "SELECT product_id, count(*), sum(sale_price) FROM order_items WHERE status = 'Complete' GROUP BY product_id",
+     {}, "ix_order_items_status_product"),
+    ("completed order count",
+     "SELECT count(*) FROM orders WHERE status = 'Complete'",
+     {}, "ix_orders_status"),
+    ("recent conversations page",
+     "SELECT id, conversation_id FROM conversations WHERE (created_at, id) < (:created_at, :id) "
+     "ORDER BY created_at DESC, id DESC LIMIT 50",
+     {"created_at": "2100-01-01 00:00:00", "id": 0}, "ix_conversations_created_id"),
+    ("conversation history page",
+     "SELECT turn, user_message, ai_response FROM conversations WHERE conversation_id = :conversation_id "
+     "AND turn > :after_turn ORDER BY turn LIMIT 50",
+     {"conversation_id": "x", "after_turn": 0}, "ux_conversations_conversation_turn"),
+    ("low stock products",
+     "SELECT product_id, available_units FROM product_stock WHERE available_units <= :threshold",
+     {"threshold": 10}, "ix_product_stock_available_units"),
+]
+
+def _plan_indexes(plan) -> List[str]:
+    """Index names referenced anywhere in a PostgreSQL JSON plan"""
+    names = []
+    if isinstance(plan, dict):
+        if "Index Name" in plan:
+            names.append(plan["Index Name"])
+        for value in plan.values():
+            names.extend(_plan_indexes(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            names.extend(_plan_indexes(value))
+    return names
+
+def explain_hot_queries(bind: Engine = None) -> List[Dict[str, Any]]:
+    """EXPLAIN each hot query and report whether its index is used"""
+    bind = bind or default_engine
+    results = []
+    with bind.connect() as connection:
+        postgres = connection.dialect.name == "postgresql"
+        for description, sql, params, index_name in HOT_QUERIES:
+            with connection.begin():
+                if postgres:
+                    # Small development tables would otherwise hide whether the index is usable
+                    connection.execute(text("SET LOCAL enable_seqscan = off"))
+                    plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+                    plan = json.loads(plan) if isinstance(plan, str) else plan
+                    used = _plan_indexes(plan)
+                    detail = ", ".join(used) or "no index"
+                else:
+                    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+                    detail = "; ".join(row[-1] for row in rows)
+                    used = [index_name] if index_name in detail else []
+            results.append({
+                "query": description,
+                "index": index_name,
+                "uses_index": index_name in used,
+                "plan": detail,
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--explain", action="store_true", help="check the hot queries use their indexes")
+    args = parser.parse_args()
+
+    if args.status:
+        for migration in status():
+            state = migration["applied_at"] or "pending"
+            print(f"{migration['version']:>4}  {migration['name']:<32} {state}")
+        return
+
+    migrate()
+
+    if args.explain:
+        results = explain_hot_queries()
+        for result in results:
+            mark = "ok  " if result["uses_index"] else "MISS"
+            print(f"{mark} {result['query']:<32} {result['index']:<34} {result['plan']}")
+        if not all(result["uses_index"] for result in results):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
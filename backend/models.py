@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 class ChatRequest(BaseModel):
@@ -10,6 +10,8 @@ class ChatResponse(BaseModel):
     response: str
     conversation_id: str
     timestamp: datetime
+    # Prompt token report; None for a cached answer. "degraded" gives the reason when the LLM was unavailable
+    prompt: Optional[Dict[str, Any]] = None
 
 class ProductResponse(BaseModel):
     product_id: str
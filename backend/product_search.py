@@ -0,0 +1,261 @@
+"""In-process inverted index behind search_products and /api/products/search"""
+import math
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import Product
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_SEARCH_REFRESH_INTERVAL = float(os.getenv("PRODUCT_SEARCH_REFRESH_INTERVAL", "300"))
+# Seconds between the cheap checks for new or edited products; removals wait for the refresh interval
+PRODUCT_SEARCH_CHECK_INTERVAL = float(os.getenv("PRODUCT_SEARCH_CHECK_INTERVAL", "5"))
+
+# Matches in the name count most, then brand, category and department
+FIELD_WEIGHTS = {"name": 3.0, "brand": 2.0, "category": 1.5, "department": 1.0}
+
+# Words that carry no product meaning in chat messages
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "can", "do", "does", "find", "for", "from",
+    "get", "have", "i", "in", "is", "it", "item", "like", "looking", "me", "my", "need", "of",
+    "on", "or", "please", "product", "recommend", "sell", "show", "some", "tell", "that", "the",
+    "there", "to", "want", "what", "which", "with", "you", "your",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Prefix expansions per query token, most common terms first
+MAX_PREFIX_TERMS = 20
+PREFIX_FACTOR = 0.6
+# Minimum trigram similarity for a typo match (pg_trgm's default), and how many such terms to use
+FUZZY_MIN_SIMILARITY = 0.3
+MAX_FUZZY_TERMS = 3
+FUZZY_FACTOR = 0.5
+
+def _stem(token: str) -> str:
+    # Fold simple plurals so "jackets" finds "Jacket"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str, drop_stopwords: bool = False) -> List[str]:
+    """Lowercase alphanumeric tokens with simple plurals folded"""
+    tokens = TOKEN_PATTERN.findall((text or "").lower())
+    if drop_stopwords:
+        tokens = [token for token in tokens if token not in STOPWORDS]
+    return [_stem(token) for token in tokens]
+
+def _trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ProductSearchIndex:
+    """Immutable inverted index over one snapshot of the products table"""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str, str, str]] = ()):
+        """Build from (id, name, brand, category, department) rows"""
+        start = time.perf_counter()
+        ids = []
+        positions: Dict[str, List[int]] = defaultdict(list)
+        weights: Dict[str, List[float]] = defaultdict(list)
+
+        for position, (product_id, name, brand, category, department) in enumerate(rows):
+            ids.append(product_id)
+            term_weights: Dict[str, float] = {}
+            for field, text in (("name", name), ("brand", brand), ("category", category), ("department", department)):
+                for term in set(tokenize(text)):
+                    term_weights[term] = term_weights.get(term, 0.0) + FIELD_WEIGHTS[field]
+            for term, weight in term_weights.items():
+                positions[term].append(position)
+                weights[term].append(weight)
+
+        self.ids = np.array(ids, dtype=np.int64)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.array(positions[term], dtype=np.int32), np.array(weights[term], dtype=np.float32))
+            for term in positions
+        }
+        self.vocabulary = sorted(self.postings)
+        self.trigram_terms: Dict[str, List[str]] = defaultdict(list)
+        for term in self.vocabulary:
+            if len(term) >= 3:
+                for trigram in _trigrams(term):
+                    self.trigram_terms[trigram].append(term)
+        self.build_seconds = time.perf_counter() - start
+
+    def __len__(self):
+        return len(self.ids)
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the posting arrays"""
+        return int(self.ids.nbytes + sum(p.nbytes + w.nbytes for p, w in self.postings.values()))
+
+    def _idf(self, term: str) -> float:
+        return math.log(1 + len(self.ids) / len(self.postings[term][0]))
+
+    def _prefix_terms(self, token: str) -> List[str]:
+        start = bisect_left(self.vocabulary, token)
+        matches = []
+        for term in self.vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            matches.append(term)
+        matches.sort(key=lambda term: len(self.postings[term][0]), reverse=True)
+        return matches[:MAX_PREFIX_TERMS]
+
+    def _fuzzy_terms(self, token: str) -> List[Tuple[str, float]]:
+        token_trigrams = _trigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for trigram in token_trigrams:
+            for term in self.trigram_terms.get(trigram, ()):
+                shared[term] += 1
+        scored = []
+        for term, count in shared.items():
+            similarity = count / (len(token_trigrams) + len(_trigrams(term)) - count)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((term, similarity))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:MAX_FUZZY_TERMS]
+
+    def expand(self, token: str) -> List[Tuple[str, float]]:
+        """Index terms a query token matches, with a score factor each"""
+        if token in self.postings:
+            return [(token, 1.0)]
+        if len(token) >= 2:
+            prefixed = self._prefix_terms(token)
+            if prefixed:
+                return [(term, PREFIX_FACTOR) for term in prefixed]
+        if len(token) >= 3:
+            return [(term, FUZZY_FACTOR * similarity) for term, similarity in self._fuzzy_terms(token)]
+        return []
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Ranked (product_id, score) pairs for a free-text query"""
+        tokens = list(dict.fromkeys(tokenize(query, drop_stopwords=True)))
+        if not tokens or not len(self.ids):
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        matched = np.zeros(len(self.ids), dtype=np.uint8)
+        for token in tokens:
+            token_hits = np.zeros(len(self.ids), dtype=bool)
+            for term, factor in self.expand(token):
+                positions, weights = self.postings[term]
+                scores[positions] += weights * (factor * self._idf(term))
+                token_hits[positions] = True
+            matched += token_hits
+
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        # Products matching more of the query rank above single-token matches
+        ranked = scores[candidates] * (matched[candidates] / len(tokens))
+        if len(candidates) > limit:
+            top = np.argpartition(-ranked, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((self.ids[candidates[top]], -ranked[top]))]
+        return [(int(self.ids[candidates[i]]), round(float(ranked[i]), 4)) for i in top]
+
+def catalog_signature(db: Session) -> Tuple[int, Optional[int], Optional[datetime]]:
+    """Cheap change detector for the products table: row count, highest ID and latest edit"""
+    count, max_id, updated_at = db.query(
+        func.count(Product.id), func.max(Product.id), func.max(Product.updated_at)
+    ).one()
+    return count, max_id, updated_at
+
+def catalog_watermark(db: Session) -> Tuple[Optional[int], Optional[datetime]]:
+    """Highest ID and latest edit; both are index lookups, unlike the row count"""
+    max_id, updated_at = db.query(func.max(Product.id), func.max(Product.updated_at)).one()
+    return max_id, updated_at
+
+def build_index(db: Session) -> ProductSearchIndex:
+    rows = db.query(Product.id, Product.name, Product.brand, Product.category, Product.department)\
+             .yield_per(10000)
+    return ProductSearchIndex(rows)
+
+class SearchIndexHolder:
+    """Shares one index per process and swaps in a rebuilt one when products change"""
+
+    def __init__(self, refresh_interval: float = PRODUCT_SEARCH_REFRESH_INTERVAL,
+                 check_interval: float = PRODUCT_SEARCH_CHECK_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.check_interval = min(check_interval, refresh_interval)
+        self.index: Optional[ProductSearchIndex] = None
+        self.signature = None
+        self.checked_at = 0.0
+        self.counted_at = 0.0
+        self.lock = threading.Lock()
+        self.rebuilding = False
+
+    def _rebuild(self, session_factory):
+        db = session_factory()
+        try:
+            signature = catalog_signature(db)
+            index = build_index(db)
+            self.index, self.signature = index, signature
+            logger.info("Product search index built: %d products in %.2fs", len(index), index.build_seconds)
+        except Exception as e:
+            logger.error("Error building product search index: %s", e)
+        finally:
+            db.close()
+            self.rebuilding = False
+
+    def get(self, db: Session) -> ProductSearchIndex:
+        """Current index; builds it on first use and schedules rebuilds when stale"""
+        from database import SessionLocal
+
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.signature = catalog_signature(db)
+                    self.index = build_index(db)
+                    self.checked_at = self.counted_at = time.monotonic()
+            return self.index
+
+        now = time.monotonic()
+        if now - self.checked_at >= self.check_interval and not self.rebuilding:
+            with self.lock:
+                if now - self.checked_at >= self.check_interval and not self.rebuilding:
+                    self.checked_at = now
+                    if now - self.counted_at >= self.refresh_interval:
+                        self.counted_at = now
+                        stale = catalog_signature(db) != self.signature
+                    else:
+                        stale = catalog_watermark(db) != self.signature[1:]
+                    if stale:
+                        self.rebuilding = True
+                        threading.Thread(target=self._rebuild, args=(SessionLocal,), daemon=True).start()
+        return self.index
+
+    def warm(self):
+        """Build the index ahead of the first search"""
+        from database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.get(db)
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        index = self.index
+        return {
+            "products": len(index) if index else 0,
+            "terms": len(index.postings) if index else 0,
+            "memory_bytes": index.memory_bytes() if index else 0,
+            "build_seconds": round(index.build_seconds, 3) if index else None,
+            "rebuilding": self.rebuilding,
+        }
+
+search_index = SearchIndexHolder()
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(ABC):
+    """Storage interface for cached LLM responses"""
+
+    # Backends doing network I/O are run in a worker thread from async code
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: int):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+class InMemoryCacheBackend(CacheBackend):
+    """Process-local LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+class RedisCacheBackend(CacheBackend):
+    """Shared cache in Redis, so every worker sees the same entries (requires the redis package)"""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "llm_response:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl: int):
+        if ttl:
+            self.client.setex(self.prefix + key, ttl, value)
+        else:
+            self.client.set(self.prefix + key, value)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "prefix": self.prefix}
+
+def normalize_message(message: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation"""
+    message = re.sub(r"\s+", " ", message.strip().lower())
+    return message.rstrip("?!. ")
+
+def context_fingerprint(context: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of the context dict; any change in the looked-up data changes the key"""
+    payload = json.dumps(context or {}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """LLM response cache keyed on the normalized message and a context fingerprint"""
+
+    def __init__(self, backend: CacheBackend, ttl: int = 300, namespace: str = ""):
+        self.backend = backend
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def make_key(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
+        digest = hashlib.sha256(normalize_message(message).encode("utf-8")).hexdigest()
+        return f"{self.namespace}{digest}:{context_fingerprint(context)}"
+
+    def get(self, message: str, context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        try:
+            value = self.backend.get(self.make_key(message, context))
+        except Exception as e:
+            logger.error("Error reading response cache: %s", e)
+            self.errors += 1
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, message: str, context: Optional[Dict[str, Any]], response: str):
+        try:
+            self.backend.set(self.make_key(message, context), response, self.ttl)
+        except Exception as e:
+            logger.error("Error writing response cache: %s", e)
+            self.errors += 1
+
+    async def aget(self, message: str, context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, message, context)
+        return self.get(message, context)
+
+    async def aset(self, message: str, context: Optional[Dict[str, Any]], response: str):
+        if self.backend.blocking:
+            await asyncio.to_thread(self.set, message, context, response)
+        else:
+            self.set(message, context, response)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": self.ttl,
+            **self.backend.stats()
+        }
+
+def create_response_cache(namespace: str = "") -> Optional[ResponseCache]:
+    """Build the response cache from environment settings (None when disabled)"""
+    backend_name = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+    ttl = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+    if backend_name in ("none", "off", "disabled"):
+        return None
+    if backend_name == "redis":
+        backend = RedisCacheBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    else:
+        backend = InMemoryCacheBackend(int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000")))
+
+    return ResponseCache(backend, ttl=ttl, namespace=namespace)
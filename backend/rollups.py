@@ -0,0 +1,147 @@
+"""Maintained sales rollups behind get_top_products and get_sales_analytics"""
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import pandas as pd
+from sqlalchemy import select, delete, func, literal, and_, text
+from sqlalchemy.engine import Connection, Engine
+
+from database import (
+    engine as default_engine, Product, Order, OrderItem,
+    ProductSalesRollup, CategorySalesRollup, SalesSummary
+)
+
+# Keep IN lists a reasonable size
+ID_BATCH_SIZE = 1000
+
+# Arbitrary key for pg_advisory_xact_lock (see migrations.MIGRATION_LOCK_KEY)
+ROLLUP_LOCK_KEY = 4141002
+
+def _lock(connection: Connection, wait: bool = True) -> bool:
+    """Take the rollup lock until the transaction ends; False if busy and not waiting"""
+    if connection.dialect.name != "postgresql":
+        return True
+    if wait:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ROLLUP_LOCK_KEY})
+        return True
+    return connection.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ROLLUP_LOCK_KEY}).scalar()
+
+def _product_rollup_select(product_ids=None):
+    statement = select(
+        Product.id,
+        Product.name,
+        Product.category,
+        Product.brand,
+        Product.retail_price,
+        Product.department,
+        func.count(OrderItem.id),
+        func.coalesce(func.sum(OrderItem.sale_price), 0.0),
+        literal(datetime.utcnow())
+    ).join(OrderItem, and_(OrderItem.product_id == Product.id, OrderItem.status == 'Complete'))\
+     .group_by(Product.id, Product.name, Product.category, Product.brand, Product.retail_price, Product.department)
+
+    if product_ids is not None:
+        statement = statement.where(Product.id.in_(product_ids))
+    return statement
+
+PRODUCT_ROLLUP_COLUMNS = [
+    "product_id", "product_name", "category", "brand", "retail_price", "department",
+    "completed_orders", "revenue", "refreshed_at"
+]
+
+def refresh_category_rollup(connection: Connection):
+    """Rebuild category totals from the product rollup (one row per product, so cheap)"""
+    table = CategorySalesRollup.__table__
+    source = ProductSalesRollup.__table__
+    connection.execute(delete(table))
+    connection.execute(table.insert().from_select(
+        ["category", "completed_orders", "revenue", "refreshed_at"],
+        select(
+            func.coalesce(source.c.category, ""),
+            func.sum(source.c.completed_orders),
+            func.sum(source.c.revenue),
+            literal(datetime.utcnow())
+        ).group_by(func.coalesce(source.c.category, ""))
+    ))
+
+def refresh_summary(connection: Connection):
+    """Recompute order totals and overall revenue"""
+    table = SalesSummary.__table__
+    total_orders = connection.execute(select(func.count(Order.id))).scalar() or 0
+    completed_orders = connection.execute(
+        select(func.count(Order.id)).where(Order.status == 'Complete')
+    ).scalar() or 0
+    total_revenue = connection.execute(
+        select(func.sum(ProductSalesRollup.revenue))
+    ).scalar() or 0
+
+    values = {
+        "total_orders": total_orders,
+        "completed_orders": completed_orders,
+        "total_revenue": total_revenue,
+        "refreshed_at": datetime.utcnow()
+    }
+    updated = connection.execute(table.update().where(table.c.id == 1).values(**values))
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(id=1, **values))
+
+def refresh_sales_rollups(connection: Connection):
+    """Full rebuild of every sales rollup within the caller's transaction"""
+    table = ProductSalesRollup.__table__
+    connection.execute(delete(table))
+    connection.execute(table.insert().from_select(PRODUCT_ROLLUP_COLUMNS, _product_rollup_select()))
+    refresh_category_rollup(connection)
+    refresh_summary(connection)
+
+def refresh_products(connection: Connection, product_ids: Iterable[int]):
+    """Recompute the rollup rows of the given products, then the category and summary totals"""
+    table = ProductSalesRollup.__table__
+    product_ids = sorted({int(product_id) for product_id in product_ids})
+    for i in range(0, len(product_ids), ID_BATCH_SIZE):
+        batch = product_ids[i:i + ID_BATCH_SIZE]
+        connection.execute(delete(table).where(table.c.product_id.in_(batch)))
+        connection.execute(table.insert().from_select(PRODUCT_ROLLUP_COLUMNS, _product_rollup_select(batch)))
+    refresh_category_rollup(connection)
+    refresh_summary(connection)
+
+def on_delta_batch(connection: Connection, table_name: str, frame: pd.DataFrame):
+    """delta_ingest hook: keep the rollups current inside the batch transaction"""
+    if frame.empty or table_name not in ("order_items", "products", "orders"):
+        return
+    _lock(connection)
+    if table_name == "order_items":
+        refresh_products(connection, frame["product_id"].dropna())
+    elif table_name == "products":
+        refresh_products(connection, frame["id"].dropna())
+    elif table_name == "orders":
+        refresh_summary(connection)
+
+def last_full_refresh(connection: Connection) -> Optional[datetime]:
+    """When the oldest product rollup row was written, i.e. the last full rebuild at the latest"""
+    return connection.execute(select(func.min(ProductSalesRollup.refreshed_at))).scalar()
+
+def refresh_all(bind: Engine = None, wait: bool = True, max_age: float = None) -> bool:
+    """Rebuild every sales rollup in one transaction; False when skipped (lock busy, or rebuilt within max_age)"""
+    bind = bind or default_engine
+    with bind.begin() as connection:
+        if not _lock(connection, wait):
+            return False
+        if max_age is not None:
+            refreshed = last_full_refresh(connection)
+            if refreshed is not None and refreshed > datetime.utcnow() - timedelta(seconds=max_age):
+                return False
+        refresh_sales_rollups(connection)
+    return True
+
+def needs_refresh(bind: Engine = None) -> bool:
+    """True until the rollups have been built once"""
+    bind = bind or default_engine
+    with bind.connect() as connection:
+        return connection.execute(select(SalesSummary.id)).first() is None
+
+if __name__ == "__main__":
+    from database import create_tables
+
+    create_tables()
+    refresh_all()
+    print("Sales rollups refreshed")
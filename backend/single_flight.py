@@ -0,0 +1,101 @@
+"""Request coalescing: identical concurrent calls share one execution"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_DB_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_DB_TIMEOUT", "10"))
+SINGLE_FLIGHT_LLM_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_LLM_TIMEOUT", "30"))
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one in-flight execution"""
+
+    def __init__(self, name: str, timeout: Optional[float] = None):
+        self.name = name
+        self.timeout = timeout
+        self.flights: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Result of fn(), shared with every concurrent caller using the same key"""
+        self.calls += 1
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self._start(key, fn, self.timeout if timeout is None else timeout)
+        else:
+            self.collapsed += 1
+
+        flight.waiters += 1
+        try:
+            # Shielded: a caller that leaves does not cancel the call for the others
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                self.cancelled += 1
+                # Cancel the shared call only once nobody is waiting for it
+                if flight.waiters == 1:
+                    self.abandoned += 1
+                    flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _start(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float]) -> _Flight:
+        async def run():
+            if timeout is None:
+                return await fn()
+            try:
+                return await asyncio.wait_for(fn(), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+
+        self.executions += 1
+        flight = _Flight(asyncio.get_running_loop().create_task(run()))
+        self.flights[key] = flight
+
+        def finished(task: asyncio.Task):
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+            if not task.cancelled() and task.exception() is not None:
+                self.errors += 1
+
+        flight.task.add_done_callback(finished)
+        return flight
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "in_flight": len(self.flights),
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "collapse_ratio": round(self.collapsed / self.calls, 3) if self.calls else 0.0,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cancelled_waiters": self.cancelled,
+            "abandoned": self.abandoned,
+            "timeout_seconds": self.timeout,
+        }
+
+business_flight = SingleFlight("business", SINGLE_FLIGHT_DB_TIMEOUT)
+llm_flight = SingleFlight("llm", SINGLE_FLIGHT_LLM_TIMEOUT)
+
+def stats() -> Dict[str, Any]:
+    return {
+        "enabled": SINGLE_FLIGHT_ENABLED,
+        "flights": [business_flight.stats(), llm_flight.stats()],
+    }
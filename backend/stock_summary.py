@@ -0,0 +1,128 @@
+"""Per-product stock summary behind get_product_stock and get_low_stock_products"""
+from contextlib import contextmanager
+from typing import Iterable
+
+import pandas as pd
+from sqlalchemy import select, delete, func, and_, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from database import engine as default_engine, Product, InventoryItem, ProductStock
+
+# Keep IN lists a reasonable size
+ID_BATCH_SIZE = 1000
+
+# Declared with PRODUCT_STOCK_TRIGGERS in database.py
+STOCK_TRIGGERS = [
+    "inventory_items_stock_insert",
+    "inventory_items_stock_update",
+    "inventory_items_stock_delete",
+]
+
+# Arbitrary key for pg_advisory_lock (see migrations.MIGRATION_LOCK_KEY); a bulk load holds it
+# while the triggers are off, and delta inventory batches share it
+STOCK_TRIGGER_LOCK_KEY = 4141004
+
+def _stock_select(product_ids=None):
+    # LEFT JOIN so products without unsold inventory get a zero row
+    statement = select(
+        Product.id,
+        func.count(InventoryItem.id),
+        func.now()
+    ).outerjoin(InventoryItem, and_(InventoryItem.product_id == Product.id, InventoryItem.sold_at.is_(None)))\
+     .group_by(Product.id)
+
+    if product_ids is not None:
+        statement = statement.where(Product.id.in_(product_ids))
+    return statement
+
+STOCK_COLUMNS = ["product_id", "available_units", "updated_at"]
+
+def refresh_product_stock(connection: Connection, product_ids: Iterable[int] = None):
+    """Recount stock for the given products, or for every product when none are given"""
+    table = ProductStock.__table__
+    if product_ids is None:
+        connection.execute(delete(table))
+        connection.execute(table.insert().from_select(STOCK_COLUMNS, _stock_select()))
+        return
+
+    product_ids = sorted({int(product_id) for product_id in product_ids})
+    for i in range(0, len(product_ids), ID_BATCH_SIZE):
+        batch = product_ids[i:i + ID_BATCH_SIZE]
+        connection.execute(delete(table).where(table.c.product_id.in_(batch)))
+        connection.execute(table.insert().from_select(STOCK_COLUMNS, _stock_select(batch)))
+
+def on_delta_batch(connection: Connection, table_name: str, frame: pd.DataFrame):
+    """delta_ingest hook: add rows for new products, and track inventory where triggers don't"""
+    if frame.empty:
+        return
+    if table_name == "products":
+        refresh_product_stock(connection, frame["id"].dropna())
+    elif table_name == "inventory_items" and connection.dialect.name != "postgresql":
+        refresh_product_stock(connection, frame["product_id"].dropna())
+
+def _track_orm_writes(session: Session, flush_context):
+    """Give products inserted through the ORM their row, and track inventory where triggers don't"""
+    connection = session.connection()
+    product_ids = {obj.id for obj in session.new if isinstance(obj, Product)}
+    if connection.dialect.name != "postgresql":
+        product_ids |= {obj.product_id for obj in (*session.new, *session.dirty, *session.deleted)
+                        if isinstance(obj, InventoryItem) and obj.product_id is not None}
+    if product_ids:
+        refresh_product_stock(connection, product_ids)
+
+# COPY loads rebuild product_stock afterwards, and delta batches use on_delta_batch
+event.listen(Session, "after_flush", _track_orm_writes)
+
+def refresh_all(bind: Engine = None):
+    """Rebuild product_stock in one transaction"""
+    bind = bind or default_engine
+    with bind.begin() as connection:
+        refresh_product_stock(connection)
+
+def _set_triggers(bind: Engine, enabled: bool):
+    action = "ENABLE" if enabled else "DISABLE"
+    with bind.begin() as connection:
+        for trigger in STOCK_TRIGGERS:
+            connection.execute(text(f"ALTER TABLE inventory_items {action} TRIGGER {trigger}"))
+
+def wait_for_triggers(connection: Connection):
+    """Wait until no bulk load has the triggers off, and keep them on until the transaction ends"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock_shared(:key)"), {"key": STOCK_TRIGGER_LOCK_KEY})
+
+@contextmanager
+def triggers_disabled(bind: Engine = None):
+    """Switch the product_stock triggers off for a bulk load; call refresh_all afterwards"""
+    bind = bind or default_engine
+    if bind.dialect.name != "postgresql":
+        yield
+        return
+    # The switch is table-wide: writers that skip wait_for_triggers go untracked until refresh_all
+    with bind.connect() as lock_connection:
+        lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": STOCK_TRIGGER_LOCK_KEY})
+        lock_connection.commit()
+        try:
+            _set_triggers(bind, False)
+            try:
+                yield
+            finally:
+                _set_triggers(bind, True)
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": STOCK_TRIGGER_LOCK_KEY})
+            lock_connection.commit()
+
+def needs_refresh(bind: Engine = None) -> bool:
+    """True when products exist but product_stock has never been built"""
+    bind = bind or default_engine
+    with bind.connect() as connection:
+        has_products = connection.execute(select(Product.id).limit(1)).first() is not None
+        has_stock = connection.execute(select(ProductStock.product_id).limit(1)).first() is not None
+    return has_products and not has_stock
+
+if __name__ == "__main__":
+    from database import create_tables
+
+    create_tables()
+    refresh_all()
+    print("Product stock refreshed")
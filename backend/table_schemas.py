@@ -0,0 +1,185 @@
+import csv
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+import pandas as pd
+
+from database import Product, Order, OrderItem, User, InventoryItem, DistributionCenter
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """How one CSV column is typed and what happens when a value is missing"""
+    dtype: str                 # "int", "float", "str" or "datetime"
+    nullable: bool = True
+    default: Any = None        # used for missing values instead of NULL
+
+def required(dtype: str) -> ColumnSpec:
+    return ColumnSpec(dtype, nullable=False)
+
+# Per-table schemas; CSV headers match column names. Defaults mirror the
+# original per-row loaders. Surrogate keys left to the database (orders.id,
+# order_items.id) are not loaded.
+TABLE_SCHEMAS: Dict[str, Dict[str, ColumnSpec]] = {
+    "distribution_centers": {
+        "id": required("int"),
+        "name": ColumnSpec("str", default=""),
+        "latitude": ColumnSpec("float", default=0.0),
+        "longitude": ColumnSpec("float", default=0.0),
+    },
+    "products": {
+        "id": required("int"),
+        "cost": ColumnSpec("float", default=0.0),
+        "category": ColumnSpec("str", default=""),
+        "name": ColumnSpec("str", default=""),
+        "brand": ColumnSpec("str", default=""),
+        "retail_price": ColumnSpec("float", default=0.0),
+        "department": ColumnSpec("str", default=""),
+        "sku": ColumnSpec("str", default=""),
+        "distribution_center_id": ColumnSpec("int", default=0),
+    },
+    "users": {
+        "id": required("int"),
+        "first_name": ColumnSpec("str", default=""),
+        "last_name": ColumnSpec("str", default=""),
+        "email": ColumnSpec("str", default=""),
+        "age": ColumnSpec("int"),
+        "country": ColumnSpec("str", default=""),
+        "city": ColumnSpec("str", default=""),
+        "state": ColumnSpec("str", default=""),
+        "postal_code": ColumnSpec("str", default=""),
+        "created_at": ColumnSpec("datetime"),
+    },
+    "orders": {
+        "order_id": required("int"),
+        "user_id": required("int"),
+        "status": ColumnSpec("str", default=""),
+        "gender": ColumnSpec("str", default=""),
+        "created_at": ColumnSpec("datetime"),
+        "returned_at": ColumnSpec("datetime"),
+        "shipped_at": ColumnSpec("datetime"),
+        "delivered_at": ColumnSpec("datetime"),
+        "num_of_item": ColumnSpec("int", default=0),
+    },
+    "order_items": {
+        "order_id": required("int"),
+        "user_id": required("int"),
+        "product_id": required("int"),
+        "inventory_item_id": ColumnSpec("int"),
+        "status": ColumnSpec("str", default=""),
+        "created_at": ColumnSpec("datetime"),
+        "shipped_at": ColumnSpec("datetime"),
+        "delivered_at": ColumnSpec("datetime"),
+        "returned_at": ColumnSpec("datetime"),
+        "sale_price": ColumnSpec("float", default=0.0),
+    },
+    "inventory_items": {
+        "id": required("int"),
+        "product_id": required("int"),
+        "created_at": ColumnSpec("datetime"),
+        "sold_at": ColumnSpec("datetime"),
+        "cost": ColumnSpec("float", default=0.0),
+        "product_category": ColumnSpec("str", default=""),
+        "product_name": ColumnSpec("str", default=""),
+        "product_brand": ColumnSpec("str", default=""),
+        "product_retail_price": ColumnSpec("float", default=0.0),
+        "product_department": ColumnSpec("str", default=""),
+        "product_sku": ColumnSpec("str", default=""),
+        "product_distribution_center_id": ColumnSpec("int", default=0),
+    },
+}
+
+TABLE_MODELS = {
+    "distribution_centers": DistributionCenter,
+    "products": Product,
+    "users": User,
+    "orders": Order,
+    "order_items": OrderItem,
+    "inventory_items": InventoryItem,
+}
+
+REJECT_REASON_COLUMN = "_reject_reason"
+
+def read_csv_kwargs(table_name: str, schema: Dict[str, ColumnSpec] = None) -> Dict[str, Any]:
+    """read_csv options that type string columns up front and skip unused columns"""
+    schema = schema or TABLE_SCHEMAS[table_name]
+    return {
+        "dtype": {name: "string" for name, spec in schema.items() if spec.dtype == "str"},
+        "usecols": lambda name: name in schema,
+    }
+
+def _coerce(values: pd.Series, dtype: str) -> pd.Series:
+    if dtype == "int":
+        numbers = pd.to_numeric(values, errors="coerce")
+        # Fractional values are not valid integers
+        numbers = numbers.where(numbers.isna() | (numbers % 1 == 0))
+        return numbers.astype("Int64")
+    if dtype == "float":
+        return pd.to_numeric(values, errors="coerce").astype("float64")
+    if dtype == "datetime":
+        # An explicit format: inferring one from the first value turns rows with another precision into NaT
+        parsed = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+        retry = parsed.isna() & values.notna()
+        if retry.any():
+            # Other layouts (e.g. "2022-01-02 11:00:00 UTC") are parsed value by value, like the per-row loaders did
+            parsed[retry] = pd.to_datetime(values[retry], errors="coerce", utc=True, format="mixed")
+        return parsed.dt.tz_localize(None)
+    return values.astype("string")
+
+def apply_schema(table_name: str, chunk: pd.DataFrame,
+                 schema: Dict[str, ColumnSpec] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Type a whole chunk at once; returns (clean rows, rejected rows with a reason column)"""
+    schema = schema or TABLE_SCHEMAS[table_name]
+    frame = pd.DataFrame(index=chunk.index)
+    reasons = pd.Series(pd.NA, index=chunk.index, dtype="string")
+
+    for name, spec in schema.items():
+        raw = chunk[name] if name in chunk.columns else pd.Series(pd.NA, index=chunk.index, dtype="object")
+        missing = raw.isna()
+        values = _coerce(raw, spec.dtype)
+
+        # Present but unparsable values reject the row
+        invalid = values.isna() & ~missing
+        reasons = reasons.mask(reasons.isna() & invalid, f"invalid {spec.dtype} in {name}")
+
+        if spec.default is not None:
+            values = values.mask(missing, spec.default)
+        elif not spec.nullable:
+            reasons = reasons.mask(reasons.isna() & missing, f"missing {name}")
+
+        frame[name] = values
+
+    rejected = reasons.notna()
+    rejects = chunk[rejected].copy()
+    rejects[REJECT_REASON_COLUMN] = reasons[rejected]
+    return frame[~rejected], rejects
+
+def frame_records(frame: pd.DataFrame):
+    """Convert a typed frame into dicts with NaN/NaT/NA mapped to None"""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+class RejectWriter:
+    """Appends rejected rows per table to <reject_dir>/<table>[.<suffix>].rejects.csv (suffix: per shard)"""
+
+    def __init__(self, reject_dir: str = "rejects", suffix: str = ""):
+        self.reject_dir = reject_dir
+        self.suffix = suffix
+        self.counts: Dict[str, int] = {}
+
+    def path(self, table_name: str) -> str:
+        suffix = f".{self.suffix}" if self.suffix else ""
+        return os.path.join(self.reject_dir, f"{table_name}{suffix}.rejects.csv")
+
+    def write(self, table_name: str, rejects: pd.DataFrame):
+        if rejects.empty:
+            return
+        os.makedirs(self.reject_dir, exist_ok=True)
+        path = self.path(table_name)
+        first_write = self.counts.get(table_name, 0) == 0
+        rejects.to_csv(path, mode="w" if first_write else "a", header=first_write, index=False,
+                       quoting=csv.QUOTE_MINIMAL)
+        self.counts[table_name] = self.counts.get(table_name, 0) + len(rejects)
+
+    def summary(self):
+        for table_name, count in self.counts.items():
+            print(f"Rejected {count} {table_name} rows, see {self.path(table_name)}")
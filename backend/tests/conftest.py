@@ -0,0 +1,6 @@
+import os
+import sys
+
+# database.py creates its engine on import; the tests bring their own in-memory databases
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
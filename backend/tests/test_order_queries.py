@@ -0,0 +1,15 @@
+from benchmarks.check_order_queries import ITEMS, trace_order_lookup
+
+def test_order_detail_is_one_select():
+    order, statements = trace_order_lookup()
+
+    selects = [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 1, selects
+    assert len(statements) == 1, statements
+    assert "error" not in order
+
+def test_order_detail_includes_customer_and_products():
+    order, _ = trace_order_lookup()
+
+    assert order["user_name"] == "Ada Lovelace"
+    assert [item["product_name"] for item in order["items"]] == [f"Product {i}" for i in range(1, ITEMS + 1)]
@@ -1,5 +1,4 @@
 import React, { useRef, useEffect } from 'react';
-import axios from 'axios';
 import { Send, Bot, User, Loader, Menu, X } from 'lucide-react';
 import ChatMessage from './ChatMessage';
 import QuickActions from './QuickActions';
@@ -32,6 +31,50 @@ const ChatInterface = () => {
     }
   }, [state.messages.length, state.selectedConversationId, actions]);
 
+  // Post a message to the streaming chat endpoint and dispatch each server-sent event
+  const streamChat = async (message, onEvent) => {
+    const response = await fetch('/api/chat/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        message: message,
+        conversation_id: state.currentConversationId
+      })
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`Chat request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+
+      events.forEach((rawEvent) => {
+        let event = 'message';
+        let data = '';
+        rawEvent.split('\n').forEach((line) => {
+          if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            data += line.slice(5).trim();
+          }
+        });
+        if (data) {
+          onEvent(event, JSON.parse(data));
+        }
+      });
+    }
+  };
+
   const sendMessage = async (message) => {
     if (!message.trim()) return;
 
@@ -46,26 +89,55 @@ const ChatInterface = () => {
     actions.setUserInput('');
     actions.setLoading(true);
 
+    const botMessageId = Date.now() + 1;
+    let botContent = '';
+    let botMessageAdded = false;
+    let conversationId = state.currentConversationId;
+
+    // Render the bot message as soon as the first token arrives, then grow it in place
+    const showBotContent = (content, streaming) => {
+      if (!botMessageAdded) {
+        botMessageAdded = true;
+        actions.addMessage({
+          id: botMessageId,
+          type: 'bot',
+          content: content,
+          timestamp: new Date(),
+          streaming: streaming
+        });
+      } else {
+        actions.updateMessage(botMessageId, { content: content, streaming: streaming });
+      }
+    };
+
     try {
-      const response = await axios.post('/api/chat', {
-        message: message,
-        conversation_id: state.currentConversationId
+      await streamChat(message, (event, data) => {
+        if (event === 'start') {
+          conversationId = data.conversation_id;
+        } else if (event === 'token') {
+          botContent += data.token;
+          showBotContent(botContent, true);
+        } else if (event === 'done') {
+          botContent = data.response;
+          showBotContent(botContent, false);
+        } else if (event === 'error') {
+          throw new Error(data.detail);
+        }
       });
 
       const botMessage = {
-        id: Date.now() + 1,
+        id: botMessageId,
         type: 'bot',
-        content: response.data.response,
+        content: botContent,
         timestamp: new Date()
       };
 
-      actions.addMessage(botMessage);
-      actions.setCurrentConversation(response.data.conversation_id);
+      actions.setCurrentConversation(conversationId);
 
       // Save conversation if it's new
       if (!state.currentConversationId) {
         const conversation = {
-          id: response.data.conversation_id,
+          id: conversationId,
           title: message.length > 30 ? message.substring(0, 30) + '...' : message,
           messages: [...state.messages, userMessage, botMessage],
           timestamp: new Date()
@@ -86,8 +158,11 @@ const ChatInterface = () => {
       }
     } catch (error) {
       console.error('Error sending message:', error);
+      if (botMessageAdded) {
+        actions.updateMessage(botMessageId, { streaming: false });
+      }
       const errorMessage = {
-        id: Date.now() + 1,
+        id: Date.now() + 2,
         type: 'bot',
         content: "I'm sorry, I'm having trouble connecting to the server right now. Please try again in a moment.",
         timestamp: new Date()
@@ -139,7 +214,7 @@ const ChatInterface = () => {
                 <ChatMessage key={message.id} message={message} />
               ))}
               
-              {state.isLoading && (
+              {state.isLoading && !state.messages.some((message) => message.streaming) && (
                 <div className="flex items-start space-x-3">
                   <div className="w-8 h-8 bg-primary-100 rounded-full flex items-center justify-center">
                     <Bot className="h-4 w-4 text-primary-600" />
@@ -14,6 +14,7 @@ const initialState = {
 const ACTIONS = {
   SET_MESSAGES: 'SET_MESSAGES',
   ADD_MESSAGE: 'ADD_MESSAGE',
+  UPDATE_MESSAGE: 'UPDATE_MESSAGE',
   SET_LOADING: 'SET_LOADING',
   SET_USER_INPUT: 'SET_USER_INPUT',
   SET_CONVERSATIONS: 'SET_CONVERSATIONS',
@@ -33,6 +34,14 @@ const chatReducer = (state, action) => {
     case ACTIONS.ADD_MESSAGE:
       return { ...state, messages: [...state.messages, action.payload] };
     
+    case ACTIONS.UPDATE_MESSAGE:
+      return {
+        ...state,
+        messages: state.messages.map(message =>
+          message.id === action.payload.id ? { ...message, ...action.payload.changes } : message
+        )
+      };
+    
     case ACTIONS.SET_LOADING:
       return { ...state, isLoading: action.payload };
     
@@ -100,6 +109,7 @@ export const ChatProvider = ({ children }) => {
   const actions = {
     setMessages: (messages) => dispatch({ type: ACTIONS.SET_MESSAGES, payload: messages }),
     addMessage: (message) => dispatch({ type: ACTIONS.ADD_MESSAGE, payload: message }),
+    updateMessage: (id, changes) => dispatch({ type: ACTIONS.UPDATE_MESSAGE, payload: { id, changes } }),
     setLoading: (loading) => dispatch({ type: ACTIONS.SET_LOADING, payload: loading }),
     setUserInput: (input) => dispatch({ type: ACTIONS.SET_USER_INPUT, payload: input }),
     setConversations: (conversations) => dispatch({ type: ACTIONS.SET_CONVERSATIONS, payload: conversations }),